@@ -3,7 +3,9 @@ from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 
 from alembic import context
-from src.db.models.receipt import Receipt, ReceiptProduct  # noqa
+from src.db.models.idempotency_key import IdempotencyKey  # noqa
+from src.db.models.receipt import Receipt, ReceiptDailyRollup, ReceiptProduct  # noqa
+from src.db.models.refresh_token import RefreshToken  # noqa
 from src.db.models.user import User  # noqa
 from src.db.session import Base
 
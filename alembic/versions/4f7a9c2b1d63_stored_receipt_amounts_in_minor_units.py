@@ -0,0 +1,65 @@
+"""Stored receipt amounts in minor units
+
+Revision ID: 4f7a9c2b1d63
+Revises: e1b07d93a5f6
+Create Date: 2026-10-18 19:05:12.418806
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '4f7a9c2b1d63'
+down_revision: Union[str, None] = 'e1b07d93a5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONEY_COLUMNS = {
+    'receipt': ('total', 'rest', 'payment_amount'),
+    'receipt_product': ('price', 'total'),
+    'receipt_daily_rollup': ('total_sum', 'payment_amount_sum'),
+}
+
+
+def upgrade() -> None:
+    # Each ALTER converts a whole column in one pass, hryvnias to kopecks.
+    # Rounding goes through numeric, which rounds half away from zero like
+    # `src.core.money.to_minor_units`.
+    for table_name, column_names in MONEY_COLUMNS.items():
+        for column_name in column_names:
+            op.alter_column(table_name, column_name,
+                       existing_type=sa.Float(),
+                       type_=sa.BigInteger(),
+                       postgresql_using=f'round({column_name}::numeric * 100)::bigint')
+
+    # Rounded float sums can be a kopeck off the sum of rounded receipts,
+    # recompute the rollups from the converted receipts instead.
+    op.execute("""
+        UPDATE receipt_daily_rollup
+        SET total_sum = totals.total_sum,
+            payment_amount_sum = totals.payment_amount_sum
+        FROM (
+            SELECT user_id,
+                   CAST(date_trunc('day', created_at AT TIME ZONE 'UTC') AS DATE) AS day,
+                   payment_type,
+                   sum(total) AS total_sum,
+                   sum(payment_amount) AS payment_amount_sum
+            FROM receipt
+            GROUP BY 1, 2, 3
+        ) AS totals
+        WHERE receipt_daily_rollup.user_id = totals.user_id
+          AND receipt_daily_rollup.day = totals.day
+          AND receipt_daily_rollup.payment_type = totals.payment_type
+    """)
+
+
+def downgrade() -> None:
+    for table_name, column_names in MONEY_COLUMNS.items():
+        for column_name in column_names:
+            op.alter_column(table_name, column_name,
+                       existing_type=sa.BigInteger(),
+                       type_=sa.Float(),
+                       postgresql_using=f'{column_name} / 100.0')
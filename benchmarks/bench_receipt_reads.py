@@ -0,0 +1,113 @@
+"""Latency and memory of reading a 100 receipt page, ORM entities vs plain rows.
+
+Run from the repository root with the usual environment variables set:
+
+    python -m benchmarks.bench_receipt_reads
+"""
+
+import timeit
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.core.constants import PaymentType
+from src.db.models.receipt import Receipt
+from src.db.models.user import User
+from src.db.session import Base
+from src.domain.mappers import map_receipt_db_to_entity
+from src.domain.models import (
+    PaymentEntity,
+    ProductEntity,
+    ReceiptEntity,
+    ReceiptFilters,
+)
+from src.repositories.receipt_repository import ReceiptRepository
+from src.schemas.receipt import PaginatedReceiptResponseSchema
+
+PAGE_SIZE = 100
+PRODUCTS_PER_RECEIPT = 5
+
+
+def populate(session: Session) -> int:
+    user = User(name="Benchmark", username="benchmark", password_hash="-")
+    session.add(user)
+    session.commit()
+
+    receipts = [
+        ReceiptEntity(
+            user_id=user.id,
+            products=tuple(
+                ProductEntity(
+                    name=f"Product {index}", price=1050 + index * 100, quantity=2
+                )
+                for index in range(PRODUCTS_PER_RECEIPT)
+            ),
+            payment=PaymentEntity(amount=10**8, type=PaymentType.CASH),
+        ).with_totals()
+        for _ in range(PAGE_SIZE)
+    ]
+    ReceiptRepository(session).save_receipts(receipts)
+    return user.id
+
+
+def orm_page(session: Session, user_id: int) -> dict:
+    """The read path before rows: ORM objects, then entities, then dicts"""
+    receipts = (
+        session.query(Receipt)
+        .options(selectinload(Receipt.products))
+        .filter(Receipt.user_id == user_id)
+        .order_by(Receipt.created_at, Receipt.id)
+        .limit(PAGE_SIZE)
+        .all()
+    )
+    return {"receipts": [map_receipt_db_to_entity(r).to_dict() for r in receipts]}
+
+
+def rows_page(session: Session, user_id: int) -> dict:
+    page = ReceiptRepository(session).list_receipts(
+        user_id, ReceiptFilters(), limit=PAGE_SIZE, offset=0
+    )
+    return {"receipts": page.receipts}
+
+
+def bench(label: str, build_page, session_factory, user_id: int) -> None:
+    def run() -> None:
+        with session_factory() as session:
+            PaginatedReceiptResponseSchema.model_validate(build_page(session, user_id))
+
+    run()
+    seconds = min(timeit.repeat(run, number=50, repeat=5)) / 50
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"  {label:<22} {seconds * 1000:>8.2f} ms/page {peak / 1024:>10,.0f} KiB peak"
+    )
+
+
+def main() -> None:
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, autoflush=False)
+    with session_factory() as session:
+        user_id = populate(session)
+
+    with session_factory() as session:
+        assert orm_page(session, user_id) == rows_page(session, user_id)
+
+    print(f"{PAGE_SIZE} receipts with {PRODUCTS_PER_RECEIPT} products each:")
+    bench("ORM entities", orm_page, session_factory, user_id)
+    bench("Core rows", rows_page, session_factory, user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Throughput of the receipt text renderer against the original implementation.
+
+Run from the repository root with the usual environment variables set:
+
+    python -m benchmarks.bench_receipt_rendering
+"""
+
+import datetime
+import timeit
+from random import Random
+
+from src.core.constants import PaymentType
+from src.core.money import from_minor_units
+from src.domain.models import PaymentEntity, ProductEntity, ReceiptEntity
+from src.services.receipt_formatting import (
+    ReceiptRenderer,
+    generate_receipt_text,
+)
+
+
+def legacy_generate_receipt_text(receipt: ReceiptEntity, line_length: int = 32) -> str:
+    """The renderer as it was before `ReceiptRenderer`, kept as a baseline.
+
+    Amounts were hryvnia floats back then, so kopecks are converted first.
+    """
+
+    def center_text(text: str) -> str:
+        return text.center(line_length)
+
+    def format_quantity_price_line(quantity: float, price: float) -> str:
+        return f"{quantity:.2f} x {price:,.2f}".replace(",", " ").ljust(line_length)
+
+    def format_product_name_line(product_name: str, total: float) -> str:
+        words = product_name.split()
+        product_lines = []
+        current_line = ""
+
+        for word in words:
+            if len(current_line) + len(word) + 1 <= line_length // 2:
+                if current_line:
+                    current_line += " "
+                current_line += word
+            else:
+                product_lines.append(current_line)
+                current_line = word
+
+        if current_line:
+            product_lines.append(current_line)
+
+        product_lines[-1] = f"{product_lines[-1]}".ljust(
+            line_length // 2
+        ) + f"{total:,.2f}".replace(",", " ").rjust(line_length // 2)
+
+        return "\n".join(product_lines)
+
+    def format_total(label: str, value: float) -> str:
+        return f"{label}".ljust(line_length // 2) + f"{value:,.2f}".replace(
+            ",", " "
+        ).rjust(line_length // 2)
+
+    lines = [center_text("ФОП Джонсонюк Борис"), "=" * line_length]
+
+    for index, product in enumerate(receipt.products):
+        lines.append(
+            format_quantity_price_line(
+                product.quantity, from_minor_units(product.price)
+            )
+        )
+        lines.append(
+            format_product_name_line(product.name, from_minor_units(product.total))
+        )
+        if index < len(receipt.products) - 1:
+            lines.append("-" * line_length)
+
+    lines.append("=" * line_length)
+    lines.append(format_total("СУМА", from_minor_units(receipt.total)))
+    lines.append(
+        format_total(
+            "Картка" if receipt.payment.type == PaymentType.CARD else "Готівка",
+            from_minor_units(receipt.payment.amount),
+        )
+    )
+    lines.append(format_total("Решта", from_minor_units(receipt.rest)))
+    lines.append("=" * line_length)
+    lines.append(center_text(receipt.created_at.strftime("%d.%m.%Y %H:%M")))
+    lines.append(center_text("Дякуємо за покупку!"))
+
+    return "\n".join(lines)
+
+
+def make_receipts(
+    receipts_count: int, products_count: int, catalog_size: int | None
+) -> list[ReceiptEntity]:
+    """Receipts whose products come from a catalog of `catalog_size` items.
+
+    Without a catalog every product line is unique.
+    """
+    random = Random(products_count)
+    receipts = []
+    for receipt_index in range(receipts_count):
+        products = []
+        for product_index in range(products_count):
+            if catalog_size is None:
+                item = receipt_index * products_count + product_index
+            else:
+                item = random.randrange(catalog_size)
+            products.append(
+                ProductEntity(
+                    name=f"Дрон FPV з акумулятором 6S чорний модель {item}",
+                    price=3100050 + item * 100,
+                    quantity=item % 7 + 1,
+                )
+            )
+        receipt = ReceiptEntity(
+            user_id=1,
+            products=tuple(products),
+            payment=PaymentEntity(amount=10**11, type=PaymentType.CASH),
+            created_at=datetime.datetime(2024, 10, 9, 14, 11),
+        )
+        receipts.append(receipt.with_totals())
+    return receipts
+
+
+def bench(label: str, fn, receipts: list[ReceiptEntity]) -> float:
+    def run() -> None:
+        for receipt in receipts:
+            fn(receipt)
+
+    seconds = min(timeit.repeat(run, number=1, repeat=5))
+    per_second = len(receipts) / seconds
+    print(f"  {label:<28} {per_second:>12,.0f} receipts/s")
+    return per_second
+
+
+def main() -> None:
+    for products_count, receipts_count in ((3, 20_000), (500, 100)):
+        for catalog_size in (300, None):
+            receipts = make_receipts(receipts_count, products_count, catalog_size)
+            for receipt in receipts[:10]:
+                assert generate_receipt_text(receipt) == legacy_generate_receipt_text(
+                    receipt
+                )
+
+            catalog = f"{catalog_size} item catalog" if catalog_size else "unique items"
+            print(f"{products_count} products per receipt, {catalog}:")
+            legacy = bench("legacy function", legacy_generate_receipt_text, receipts)
+            renderer = ReceiptRenderer(32)
+            current = bench("ReceiptRenderer.render", renderer.render, receipts)
+            bench(
+                "ReceiptRenderer.iter_lines",
+                lambda receipt: sum(1 for _ in renderer.iter_lines(receipt)),
+                receipts,
+            )
+            print(f"  speedup: {current / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cost of turning a page of receipts into a JSON response body.
+
+Compares what FastAPI does for a route with a `response_model` (validate the
+payload, encode it to JSON-compatible data, `json.dumps` it) with returning a
+`PayloadJSONResponse`. Run from the repository root with the usual environment
+variables set:
+
+    python -m benchmarks.bench_receipt_serialization
+"""
+
+import datetime
+import json
+import timeit
+import uuid
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from src.api.responses import PayloadJSONResponse
+from src.core.constants import PaymentType
+from src.schemas.receipt import PaginatedReceiptResponseSchema
+
+
+def make_page(receipts_count: int, products_count: int = 5) -> dict:
+    created_at = datetime.datetime(2024, 10, 9, 14, 11, tzinfo=datetime.timezone.utc)
+    return {
+        "receipts": [
+            {
+                "id": index,
+                "public_id": uuid.uuid4(),
+                "total": 1234.5,
+                "rest": 10.25,
+                "products": [
+                    {
+                        "name": f"Product {product}",
+                        "price": 10.5 + product,
+                        "quantity": 2.0,
+                        "total": 21.0 + 2 * product,
+                    }
+                    for product in range(products_count)
+                ],
+                "payment": {"type": PaymentType.CASH, "amount": 1244.75},
+                "created_at": created_at,
+            }
+            for index in range(receipts_count)
+        ],
+        "total_count": receipts_count,
+        "next_cursor": None,
+    }
+
+
+def main() -> None:
+    adapter = TypeAdapter(PaginatedReceiptResponseSchema)
+
+    def response_model_body(page: dict) -> bytes:
+        content = adapter.dump_python(adapter.validate_python(page), mode="json")
+        return JSONResponse(content).body
+
+    def payload_body(page: dict) -> bytes:
+        return PayloadJSONResponse(page).body
+
+    for receipts_count in (10, 100, 1000):
+        page = make_page(receipts_count)
+        assert json.loads(response_model_body(page)) == json.loads(payload_body(page))
+
+        print(f"{receipts_count} receipts per page:")
+        timings = {}
+        for label, fn in (
+            ("response_model + json", response_model_body),
+            ("PayloadJSONResponse", payload_body),
+        ):
+            number = max(1, 2000 // receipts_count)
+            seconds = min(timeit.repeat(lambda: fn(page), number=number, repeat=5))
+            timings[label] = seconds / number
+            print(f"  {label:<24} {timings[label] * 1000:>8.3f} ms")
+        speedup = timings["response_model + json"] / timings["PayloadJSONResponse"]
+        print(f"  speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, List, Optional, Protocol, Sequence, Tuple
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core import settings
+from src.core.constants import RateLimitKey
+from src.core.token_verifier import token_verifier
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """At most `requests` per `seconds` for each user or client address.
+
+    Requests are counted with a token bucket, so a client may spend the whole
+    allowance in a burst and then gets one more request every
+    `seconds / requests`.
+    """
+
+    requests: int
+    seconds: float
+    key: RateLimitKey = RateLimitKey.USER
+    # HTTP methods the limit applies to, all of them when unset
+    methods: Optional[FrozenSet[str]] = None
+
+    @property
+    def rate(self) -> float:
+        return self.requests / self.seconds
+
+
+class RateLimitBackend(Protocol):
+    """Storage for token buckets, e.g. process-local or a shared store"""
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        """Take a token, return 0 if allowed or the seconds until one is available"""
+
+    def clear(self) -> None: ...
+
+
+class LocalRateLimitBackend:
+    """Token buckets in process memory.
+
+    Buckets are spread over shards with a lock each, so requests of different
+    clients rarely wait for one another. Each shard keeps its most recently
+    used buckets, a dropped bucket starts over full.
+    """
+
+    SHARDS = 64
+
+    def __init__(
+        self, max_buckets: int, timer: Callable[[], float] = time.monotonic
+    ) -> None:
+        self._timer = timer
+        self._shard_size = max(1, max_buckets // self.SHARDS)
+        self._shards: List[Tuple[threading.Lock, OrderedDict]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(self.SHARDS)
+        ]
+
+    def acquire(self, key: str, limit: RateLimit) -> float:
+        lock, buckets = self._shards[hash(key) % self.SHARDS]
+        with lock:
+            now = self._timer()
+            tokens, updated_at = buckets.get(key, (limit.requests, now))
+            tokens = min(limit.requests, tokens + (now - updated_at) * limit.rate)
+
+            retry_after = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                retry_after = (1 - tokens) / limit.rate
+
+            buckets[key] = (tokens, now)
+            buckets.move_to_end(key)
+            if len(buckets) > self._shard_size:
+                buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self) -> None:
+        for lock, buckets in self._shards:
+            with lock:
+                buckets.clear()
+
+
+class RateLimiter:
+    """Rate limits per group of routes, checked before a request is routed"""
+
+    def __init__(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+        self._rules: List[Tuple[str, BaseRoute, Sequence[RateLimit]]] = []
+
+    def use_backend(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    def limit_routes(
+        self, group: str, routes: Sequence[BaseRoute], limits: Sequence[RateLimit]
+    ) -> None:
+        """Apply `limits` to `routes`, requests to any of them share the buckets"""
+        self._rules.extend((group, route, tuple(limits)) for route in routes)
+
+    def check(self, scope: Scope) -> float:
+        """Seconds the request has to wait, 0 if it may proceed"""
+        for group, route, limits in self._rules:
+            match, _ = route.matches(scope)
+            if match != Match.FULL:
+                continue
+
+            retry_after = 0.0
+            for limit in limits:
+                if limit.methods is not None and scope["method"] not in limit.methods:
+                    continue
+                client = client_key(scope, limit.key)
+                key = f"{group}:{limit.requests}/{limit.seconds}:{client}"
+                retry_after = max(retry_after, self.backend.acquire(key, limit))
+            return retry_after
+        return 0.0
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+def client_key(scope: Scope, key: RateLimitKey) -> str:
+    # The access token is verified (and cached) by the token verifier, a
+    # request without a valid one is limited by its address instead.
+    if key == RateLimitKey.USER:
+        user_id = bearer_user_id(scope)
+        if user_id is not None:
+            return f"user:{user_id}"
+
+    client = scope.get("client")
+    return f"ip:{client[0] if client else ''}"
+
+
+def bearer_user_id(scope: Scope) -> Optional[int]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return None
+            claims = token_verifier.verify(token)
+            if claims and claims.get("type") == "access":
+                return claims.get("uid")
+            return None
+    return None
+
+
+class RateLimitMiddleware:
+    """Answers `429 Too Many Requests` with `Retry-After` over the limits"""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter) -> None:
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            retry_after = self.limiter.check(scope)
+            if retry_after:
+                response = JSONResponse(
+                    {"detail": "Too many requests, try again later"},
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
+
+
+rate_limiter = RateLimiter(
+    LocalRateLimitBackend(max_buckets=settings.RATE_LIMIT_MAX_BUCKETS)
+)
@@ -0,0 +1,16 @@
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+class PayloadJSONResponse(ORJSONResponse):
+    """JSON response for payloads the services already shaped for a response model.
+
+    Returning it from a route skips FastAPI's validation and encoding against
+    the route's `response_model`, which then only documents the payload.
+    Timezone-aware UTC datetimes keep the `Z` suffix that validation produced.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
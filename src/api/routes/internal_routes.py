@@ -0,0 +1,34 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+
+from src.core.token_verifier import token_verifier
+from src.db.pool_metrics import pool_snapshot
+from src.db.session import async_engine, async_read_engine, engine, read_engine
+from src.dependencies.internal import verify_internal_token
+from src.services.receipt_queue import receipt_queue
+
+router = APIRouter(dependencies=[Depends(verify_internal_token)])
+
+
+@router.get("/db/pools")
+async def get_db_pool_stats() -> Dict[str, Any]:
+    pools = {"primary": pool_snapshot(engine.pool)}
+    if async_engine is not None:
+        pools["primary_async"] = pool_snapshot(async_engine.sync_engine.pool)
+    if read_engine is not None:
+        pools["replica"] = pool_snapshot(read_engine.pool)
+    if async_read_engine is not None:
+        pools["replica_async"] = pool_snapshot(async_read_engine.sync_engine.pool)
+    return pools
+
+
+@router.get("/auth/token-cache")
+async def get_token_cache_stats() -> Dict[str, int]:
+    return token_verifier.stats()
+
+
+@router.get("/receipts/queue")
+async def get_receipt_queue_stats() -> Dict[str, Any]:
+    return await run_in_threadpool(receipt_queue.stats)
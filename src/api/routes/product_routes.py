@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Query
+
+from src.api.responses import PayloadJSONResponse
+from src.dependencies.auth import get_current_user_id
+from src.dependencies.receipt import get_receipt_filters, get_receipt_service
+from src.domain.models import ReceiptFilters
+from src.schemas.receipt import TopProductsResponseSchema
+from src.services.receipt import ReceiptService
+
+router = APIRouter()
+
+
+@router.get("/products/top", response_model=TopProductsResponseSchema)
+async def top_products(
+    receipt_service: ReceiptService = Depends(get_receipt_service),
+    current_user_id: int = Depends(get_current_user_id),
+    filters: ReceiptFilters = Depends(get_receipt_filters),
+    limit: int = Query(20, ge=1, le=100),
+):
+    products = await receipt_service.top_products(
+        user_id=current_user_id, filters=filters, limit=limit
+    )
+    return PayloadJSONResponse({"products": [p.to_dict() for p in products]})
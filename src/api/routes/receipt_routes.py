@@ -1,85 +1,355 @@
-import datetime
-from typing import Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from fastapi.responses import PlainTextResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from src.core.constants import PaymentType
-from src.db.models.user import User
-from src.dependencies.auth import get_current_user
-from src.dependencies.receipt import get_receipt_service
+from src.api.responses import PayloadJSONResponse
+from src.core.constants import (
+    RECEIPT_LINE_LENGTH_MAX,
+    RECEIPT_LINE_LENGTH_MIN,
+    CountMode,
+    ExportFormat,
+    PaginationMode,
+    ReceiptSortField,
+    SortDirection,
+    StatsPeriod,
+)
+from src.dependencies.auth import get_current_user_id
+from src.dependencies.idempotency import get_idempotency_key, get_idempotency_service
+from src.dependencies.receipt import (
+    get_receipt_exporter,
+    get_receipt_filters,
+    get_receipt_service,
+    get_respond_async,
+)
+from src.domain.models import ReceiptEntity, ReceiptFilters
+from src.repositories.pagination import InvalidCursorError
 from src.schemas.receipt import (
     PaginatedReceiptResponseSchema,
+    ReceiptBatchCreateResponseSchema,
+    ReceiptBatchCreateSchema,
     ReceiptCreateSchema,
     ReceiptResponseSchema,
+    ReceiptStatsResponseSchema,
+    ReceiptStatusResponseSchema,
+)
+from src.services.idempotency import (
+    IdempotencyKeyInProgressException,
+    IdempotencyKeyReusedException,
+    IdempotencyService,
+    request_hash,
 )
-from src.services.receipt import ReceiptService
-from src.services.receipt_formatting import generate_receipt_text
+from src.services.receipt import ReceiptService, UnknownPaymentTypeException
+from src.services.receipt_export import EXPORT_MEDIA_TYPES, ReceiptExporter
+from src.services.receipt_queue import ReceiptQueueFullError
 
 router = APIRouter()
 
+ACCEPTED_RESPONSES = {
+    status.HTTP_202_ACCEPTED: {
+        "description": "Queued to be stored, for `Prefer: respond-async`"
+    }
+}
+
 
 @router.post(
     "/receipts",
     response_model=ReceiptResponseSchema,
     status_code=status.HTTP_201_CREATED,
+    responses=ACCEPTED_RESPONSES,
 )
-def create_receipt(
+async def create_receipt(
+    request: Request,
     receipt_data: ReceiptCreateSchema,
     receipt_service: ReceiptService = Depends(get_receipt_service),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    idempotency_service: IdempotencyService = Depends(get_idempotency_service),
+    respond_async: bool = Depends(get_respond_async),
+):
+    async def create() -> Response:
+        if respond_async:
+            (receipt,) = await accept_receipts(
+                receipt_service, [receipt_data.dict()], current_user_id
+            )
+            return accepted_response(
+                receipt.to_dict(),
+                location=str(
+                    request.url_for("get_receipt_status", public_id=receipt.public_id)
+                ),
+            )
+
+        # With a key the receipt is committed along with the stored response.
+        receipt = await receipt_service.create_receipt(
+            receipt_data.dict(), current_user_id, commit=idempotency_key is None
+        )
+        return PayloadJSONResponse(
+            receipt.to_dict(), status_code=status.HTTP_201_CREATED
+        )
+
+    return await run_idempotently(
+        idempotency_service,
+        current_user_id,
+        idempotency_key,
+        request_hash(request.url.path, receipt_data.model_dump(mode="json")),
+        create,
+    )
+
+
+@router.post(
+    "/receipts/batch",
+    response_model=ReceiptBatchCreateResponseSchema,
+    status_code=status.HTTP_201_CREATED,
+    responses=ACCEPTED_RESPONSES,
+)
+async def create_receipts_batch(
+    request: Request,
+    receipts_data: ReceiptBatchCreateSchema,
+    receipt_service: ReceiptService = Depends(get_receipt_service),
+    current_user_id: int = Depends(get_current_user_id),
+    idempotency_key: Optional[str] = Depends(get_idempotency_key),
+    idempotency_service: IdempotencyService = Depends(get_idempotency_service),
+    respond_async: bool = Depends(get_respond_async),
+):
+    async def create() -> Response:
+        if respond_async:
+            receipts = await accept_receipts(
+                receipt_service,
+                [receipt_data.dict() for receipt_data in receipts_data],
+                current_user_id,
+            )
+            return accepted_response(
+                {"receipts": [{"id": None, "public_id": r.public_id} for r in receipts]}
+            )
+
+        receipts = await receipt_service.create_receipts(
+            [receipt_data.dict() for receipt_data in receipts_data],
+            current_user_id,
+            commit=idempotency_key is None,
+        )
+        return PayloadJSONResponse(
+            {"receipts": [{"id": r.id, "public_id": r.public_id} for r in receipts]},
+            status_code=status.HTTP_201_CREATED,
+        )
+
+    return await run_idempotently(
+        idempotency_service,
+        current_user_id,
+        idempotency_key,
+        request_hash(
+            request.url.path, [r.model_dump(mode="json") for r in receipts_data]
+        ),
+        create,
+    )
+
+
+async def accept_receipts(
+    receipt_service: ReceiptService, receipts_data: List[Dict], user_id: int
+) -> List[ReceiptEntity]:
+    try:
+        return await receipt_service.accept_receipts(receipts_data, user_id)
+    except UnknownPaymentTypeException as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.message
+        )
+    except ReceiptQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.message,
+            headers={"Retry-After": "1"},
+        )
+
+
+def accepted_response(content, location: Optional[str] = None) -> Response:
+    headers = {"Preference-Applied": "respond-async"}
+    if location is not None:
+        headers["Location"] = location
+    return PayloadJSONResponse(
+        content, status_code=status.HTTP_202_ACCEPTED, headers=headers
+    )
+
+
+async def run_idempotently(
+    idempotency_service: IdempotencyService,
+    user_id: int,
+    idempotency_key: Optional[str],
+    request_hash: str,
+    handler: Callable[[], Awaitable[Response]],
+) -> Response:
+    if idempotency_key is None:
+        return await handler()
+
+    try:
+        return await idempotency_service.run(
+            user_id, idempotency_key, request_hash, handler
+        )
+    except IdempotencyKeyInProgressException as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=e.message,
+            headers={"Retry-After": "1"},
+        )
+    except IdempotencyKeyReusedException as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=e.message
+        )
+
+
+# Registered before `/receipts/{receipt_id}`, which would otherwise match them.
+@router.get("/receipts/stats", response_model=ReceiptStatsResponseSchema)
+async def receipt_stats(
+    receipt_service: ReceiptService = Depends(get_receipt_service),
+    current_user_id: int = Depends(get_current_user_id),
+    period: Optional[StatsPeriod] = None,
+    by_payment_type: bool = False,
+    filters: ReceiptFilters = Depends(get_receipt_filters),
 ):
-    receipt = receipt_service.create_receipt(receipt_data.dict(), current_user.id)
-    return receipt.to_dict()
+    stats = await receipt_service.receipt_stats(
+        user_id=current_user_id,
+        filters=filters,
+        period=period,
+        by_payment_type=by_payment_type,
+    )
+    return PayloadJSONResponse({"groups": [group.to_dict() for group in stats]})
+
+
+@router.get("/receipts/export", response_class=StreamingResponse)
+async def export_receipts(
+    receipt_exporter: ReceiptExporter = Depends(get_receipt_exporter),
+    current_user_id: int = Depends(get_current_user_id),
+    format: ExportFormat = ExportFormat.NDJSON,
+    filters: ReceiptFilters = Depends(get_receipt_filters),
+    line_length: int = Query(
+        32, ge=RECEIPT_LINE_LENGTH_MIN, le=RECEIPT_LINE_LENGTH_MAX
+    ),
+):
+    content = receipt_exporter.export(
+        user_id=current_user_id,
+        filters=filters,
+        export_format=format,
+        line_length=line_length,
+    )
+    return StreamingResponse(
+        content,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={
+            "Content-Disposition": f'attachment; filename="receipts.{format.value}"'
+        },
+    )
 
 
 @router.get("/receipts/{receipt_id}", response_model=ReceiptResponseSchema)
-def get_receipt_by_id(
+async def get_receipt_by_id(
     receipt_id: int,
     receipt_service: ReceiptService = Depends(get_receipt_service),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
 ):
-    receipt = receipt_service.get_receipt_by_id(
-        receipt_id=receipt_id, user_id=current_user.id
+    receipt = await receipt_service.get_receipt_by_id(
+        receipt_id=receipt_id, user_id=current_user_id
     )
 
     if not receipt:
         raise HTTPException(status_code=404, detail="Receipt not found")
 
-    return receipt.to_dict()
+    return PayloadJSONResponse(receipt)
 
 
 @router.get("/receipts", response_model=PaginatedReceiptResponseSchema)
-def list_receipts(
+async def list_receipts(
     receipt_service: ReceiptService = Depends(get_receipt_service),
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
     limit: int = Query(10, ge=1),
     offset: int = Query(0, ge=0),
-    created_after: Optional[datetime.datetime] = None,
-    minimum_total: Optional[float] = None,
-    payment_type: Optional[PaymentType] = None,
+    filters: ReceiptFilters = Depends(get_receipt_filters),
+    pagination: PaginationMode = PaginationMode.OFFSET,
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
+    order_by: ReceiptSortField = ReceiptSortField.CREATED_AT,
+    order: SortDirection = SortDirection.ASC,
 ):
-    receipts, total_count = receipt_service.list_receipts(
-        user_id=current_user.id,
-        limit=limit,
-        offset=offset,
-        created_after=created_after,
-        minimum_total=minimum_total,
-        payment_type=payment_type,
+    if cursor:
+        pagination = PaginationMode.CURSOR
+
+    try:
+        page = await receipt_service.list_receipts(
+            user_id=current_user_id,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            pagination=pagination,
+            cursor=cursor,
+            count_mode=count,
+            sort_field=order_by,
+            direction=order,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+    return PayloadJSONResponse(
+        {
+            "receipts": page.receipts,
+            "total_count": page.total_count,
+            "next_cursor": page.next_cursor,
+        }
     )
 
-    return {"receipts": [r.to_dict() for r in receipts], "total_count": total_count}
+
+@router.get("/receipts/{public_id}/status", response_model=ReceiptStatusResponseSchema)
+async def get_receipt_status(
+    public_id: UUID,
+    receipt_service: ReceiptService = Depends(get_receipt_service),
+    current_user_id: int = Depends(get_current_user_id),
+):
+    receipt_status = await receipt_service.get_receipt_status(
+        public_id=public_id, user_id=current_user_id
+    )
+
+    if not receipt_status:
+        raise HTTPException(status_code=404, detail="Receipt not found")
+
+    return PayloadJSONResponse(receipt_status.to_dict())
 
 
 @router.get("/receipts/{public_id}/view", response_class=PlainTextResponse)
-def view_receipt_by_public_id(
-    public_id: str,
-    line_length: Optional[int] = Query(32),
+async def view_receipt_by_public_id(
+    public_id: UUID,
+    line_length: int = Query(
+        32, ge=RECEIPT_LINE_LENGTH_MIN, le=RECEIPT_LINE_LENGTH_MAX
+    ),
+    if_none_match: Optional[str] = Header(None),
     receipt_service: ReceiptService = Depends(get_receipt_service),
-) -> str:
-    receipt = receipt_service.view_receipt_by_public_id(public_id=public_id)
+) -> Response:
+    rendered = await receipt_service.render_receipt_by_public_id(
+        public_id=public_id, line_length=line_length
+    )
 
-    if not receipt:
+    if not rendered:
         raise HTTPException(status_code=404, detail="Receipt not found")
 
-    return generate_receipt_text(receipt, line_length)
+    # Receipts are immutable, browsers and CDNs may keep them forever.
+    headers = {
+        "ETag": rendered.etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+    if if_none_match and etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return PlainTextResponse(rendered.text, headers=headers)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a `W/` prefix does not matter.
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
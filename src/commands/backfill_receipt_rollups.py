@@ -0,0 +1,30 @@
+"""Rebuild `receipt_daily_rollup` from the receipt table.
+
+The migration that adds the table fills it, run this whenever the rollups need
+to be recomputed:
+
+    python -m src.commands.backfill_receipt_rollups [--user-id ID]
+"""
+
+import argparse
+from typing import Optional, Sequence
+
+from src.db.session import SessionLocal
+from src.repositories.receipt_rollup_repository import ReceiptRollupRepository
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--user-id", type=int, help="only rebuild the rollups of this user"
+    )
+    args = parser.parse_args(argv)
+
+    with SessionLocal() as db_session:
+        rows = ReceiptRollupRepository(db_session).rebuild(user_id=args.user_id)
+
+    print(f"Wrote {rows} receipt_daily_rollup rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Delete expired rows from `idempotency_key`.
+
+The application does this every IDEMPOTENCY_KEY_PURGE_INTERVAL_SECONDS, run
+it by hand to purge right away:
+
+    python -m src.commands.purge_idempotency_keys
+"""
+
+import argparse
+from typing import Optional, Sequence
+
+from src.db.session import SessionLocal
+from src.repositories.idempotency_key_repository import IdempotencyKeyRepository
+
+
+def purge_expired_idempotency_keys() -> int:
+    with SessionLocal() as db_session:
+        return IdempotencyKeyRepository(db_session).purge_expired()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args(argv)
+    rows = purge_expired_idempotency_keys()
+    print(f"Deleted {rows} expired idempotency_key rows")
+
+
+if __name__ == "__main__":
+    main()
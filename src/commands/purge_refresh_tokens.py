@@ -0,0 +1,28 @@
+"""Delete expired rows from `refresh_token`.
+
+The application does this every REFRESH_TOKEN_PURGE_INTERVAL_SECONDS, run it
+by hand to purge right away:
+
+    python -m src.commands.purge_refresh_tokens
+"""
+
+import argparse
+from typing import Optional, Sequence
+
+from src.db.session import SessionLocal
+from src.repositories.refresh_token_repository import RefreshTokenRepository
+
+
+def purge_expired_refresh_tokens() -> int:
+    with SessionLocal() as db_session:
+        return RefreshTokenRepository(db_session).purge_expired()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args(argv)
+    rows = purge_expired_refresh_tokens()
+    print(f"Deleted {rows} expired refresh_token rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+from typing import Dict, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -8,9 +9,79 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 class Settings(BaseSettings):
     BASE_DIR: str = BASE_DIR
     DATABASE_URL: str
+    DATABASE_ASYNC_ENABLED: bool = False
+    DATABASE_ASYNC_URL: Optional[str] = None
+    # Replica for reads, all traffic goes to DATABASE_URL when unset
+    DATABASE_READ_URL: Optional[str] = None
+    DATABASE_READ_ASYNC_URL: Optional[str] = None
+    # Reads of a user go to the primary for this long after the user wrote
+    READ_YOUR_WRITES_SECONDS: float = 5
+    READ_YOUR_WRITES_MAX_USERS: int = 100_000
+
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    RECEIPT_TEXT_CACHE_MAX_ENTRIES: int = 10_000
+    RECEIPT_TEXT_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+
+    # Diagnostics under /api/internal, requests must send the shared secret in
+    # the `X-Internal-Token` header and are rejected while it is unset
+    INTERNAL_API_ENABLED: bool = False
+    INTERNAL_API_TOKEN: Optional[str] = None
     SECRET_KEY: str
+    # Key id of SECRET_KEY, written to the `kid` header of issued tokens
+    JWT_KEY_ID: str = "default"
+    # Previous keys by id, still accepted until the tokens they signed expire
+    JWT_VERIFICATION_KEYS: Dict[str, str] = {}
+    ACCESS_TOKEN_CACHE_MAX_SIZE: int = 10_000
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     REFRESH_TOKEN_EXPIRE_MINUTES: int
+    # Expired rows of the refresh_token table are deleted this often
+    REFRESH_TOKEN_PURGE_INTERVAL_SECONDS: int = 3600
+    REVOKED_REFRESH_TOKENS_MAX_SIZE: int = 100_000
+
+    BCRYPT_ROUNDS: int = 12
+    # Worker processes for bcrypt, defaults to the number of CPUs
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    # Hashing jobs running or queued before new ones are rejected
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    USER_CACHE_TTL_SECONDS: int = 300
+    USER_CACHE_MAX_SIZE: int = 10_000
+
+    # Retries with the same Idempotency-Key get the stored response this long
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 60 * 60
+    # A request that holds a key longer than this is assumed lost
+    IDEMPOTENCY_KEY_LOCK_SECONDS: int = 60
+    IDEMPOTENCY_KEY_PURGE_INTERVAL_SECONDS: int = 3600
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_MAX_BUCKETS: int = 100_000
+    # Requests per minute and client address to the auth endpoints
+    AUTH_RATE_LIMIT_PER_MINUTE: int = 20
+    # Receipt creations per minute and user
+    RECEIPT_CREATE_RATE_LIMIT_PER_MINUTE: int = 120
+
+    # Receipt creation answers `202 Accepted` to clients sending
+    # `Prefer: respond-async` and stores the receipts in the background
+    RECEIPT_WRITE_BEHIND_ENABLED: bool = False
+    RECEIPT_QUEUE_PATH: str = os.path.join(
+        os.path.dirname(BASE_DIR), "receipt_queue.db"
+    )
+    # Pending receipts before creation is rejected with `503`
+    RECEIPT_QUEUE_MAX_SIZE: int = 10_000
+    # Receipts stored per transaction by the background worker
+    RECEIPT_QUEUE_BATCH_SIZE: int = 200
+    RECEIPT_QUEUE_POLL_SECONDS: float = 0.05
+    # Wait after the database failed to store a batch
+    RECEIPT_QUEUE_RETRY_SECONDS: float = 1
+
+    RECEIPT_COUNT_CACHE_TTL_SECONDS: int = 300
+    RECEIPT_COUNT_CACHE_MAX_USERS: int = 10_000
+    RECEIPT_COUNT_CACHE_MAX_FILTERS_PER_USER: int = 32
 
     class Config:
         env_file = os.path.join(BASE_DIR, ".env")
@@ -1,6 +1,59 @@
 from enum import Enum as PyEnum
 
+RECEIPT_BATCH_MAX_SIZE = 500
+RECEIPT_PRODUCT_MAX_QUANTITY = 1_000_000
+RECEIPT_EXPORT_BATCH_SIZE = 500
+# Characters per line of text receipts, from narrow thermal paper to A4
+RECEIPT_LINE_LENGTH_MIN = 20
+RECEIPT_LINE_LENGTH_MAX = 200
+
 
 class PaymentType(str, PyEnum):
     CASH = "cash"
     CARD = "card"
+
+
+class PaginationMode(str, PyEnum):
+    OFFSET = "offset"
+    CURSOR = "cursor"
+
+
+class ReceiptSortField(str, PyEnum):
+    CREATED_AT = "created_at"
+    TOTAL = "total"
+
+
+class SortDirection(str, PyEnum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+class CountMode(str, PyEnum):
+    EXACT = "exact"
+    ESTIMATE = "estimate"
+    NONE = "none"
+
+
+class ExportFormat(str, PyEnum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    TEXT = "text"
+
+
+class StatsPeriod(str, PyEnum):
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class RateLimitKey(str, PyEnum):
+    USER = "user"
+    IP = "ip"
+
+
+class ReceiptIngestionStatus(str, PyEnum):
+    # Accepted with `202`, waiting in the queue to be stored
+    QUEUED = "queued"
+    STORED = "stored"
+    # Rejected by the database, it will not be stored
+    FAILED = "failed"
@@ -0,0 +1,21 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+# Money is stored and computed in integer minor units (kopecks), so sums and
+# differences are exact. Amounts are converted at the API boundary only.
+MINOR_UNITS = 100
+# Largest amount, in hryvnias, accepted from clients. Receipt totals are held
+# to it as well, so that kopeck sums stay far within the bigint columns.
+MAX_AMOUNT = 10**9
+
+
+def to_minor_units(amount: float | Decimal | str) -> int:
+    """Kopecks in a hryvnia amount, rounded half up to a whole kopeck"""
+    # `str` keeps the shortest decimal form of a float, e.g. 0.1 and not
+    # 0.1000000000000000055511151231257827.
+    minor = Decimal(str(amount)) * MINOR_UNITS
+    return int(minor.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(amount: int | float) -> float:
+    """Hryvnia amount of `amount` kopecks"""
+    return amount / MINOR_UNITS
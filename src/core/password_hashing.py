@@ -0,0 +1,79 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from src.core import settings
+from src.core.security import hash_password, verify_and_update_password
+
+T = TypeVar("T")
+
+
+class PasswordHasherBusyError(Exception):
+    def __init__(self) -> None:
+        self.message = "Too many authentication requests, try again later"
+        super().__init__(self.message)
+
+
+class PasswordHasher:
+    """Runs bcrypt in a pool of worker processes with a cap on pending jobs.
+
+    bcrypt holds the GIL for most of its work, so threads cannot spread it over
+    several cores. Jobs over `max_pending` are rejected right away instead of
+    queueing behind a login storm.
+    """
+
+    def __init__(self, max_workers: Optional[int], max_pending: int) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a process that already runs threads is unsafe.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def _submit(self, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PasswordHasherBusyError()
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> Tuple[bool, str | None]:
+        return await self._submit(verify_and_update_password, password, password_hash)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
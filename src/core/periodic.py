@@ -0,0 +1,18 @@
+import asyncio
+import logging
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+async def run_periodically(interval: float, job: Callable[[], Any]) -> None:
+    """Run a blocking `job` in the threadpool every `interval` seconds, forever"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            # Try again on the next round, e.g. once the database is back.
+            logger.exception("Periodic job %s failed", job.__name__)
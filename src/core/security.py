@@ -1,16 +1,22 @@
 import copy
 import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
+from uuid import UUID
 
 import jwt
-from jwt import DecodeError
 from passlib.context import CryptContext
 
 from src.core import settings
+from src.core.token_verifier import JWT_ALGORITHM, token_verifier
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-JWT_ALGORITHM = "HS256"
+# Hashes below the configured cost are reported by `needs_update` and upgraded
+# on the next successful login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -21,40 +27,69 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def generate_auth_tokens(username: str):
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, str | None]:
+    """Verify a password and return a new hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+def generate_auth_tokens(
+    username: str, user_id: int, refresh_token_id: UUID, family_id: UUID
+):
     return {
-        "access_token": generate_access_token(username),
-        "refresh_token": generate_refresh_token(username),
+        "access_token": generate_access_token(username, user_id),
+        "refresh_token": generate_refresh_token(
+            username, user_id, refresh_token_id, family_id
+        ),
         "token_type": "bearer",
     }
 
 
-def generate_access_token(username: str):
+def generate_access_token(username: str, user_id: int | None = None):
     return generate_jwt_token(
-        {"sub": username, "type": "access"}, settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        user_claims(username, user_id, token_type="access"),
+        settings.ACCESS_TOKEN_EXPIRE_MINUTES,
     )
 
 
-def generate_refresh_token(username: str):
-    return generate_jwt_token(
-        {"sub": username, "type": "refresh"}, settings.REFRESH_TOKEN_EXPIRE_MINUTES
+def generate_refresh_token(
+    username: str, user_id: int, token_id: UUID, family_id: UUID
+):
+    # `jti` identifies the token for rotation, `fam` the login it descends from.
+    claims = user_claims(username, user_id, token_type="refresh")
+    claims.update({"jti": str(token_id), "fam": str(family_id)})
+    return generate_jwt_token(claims, settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+
+
+def refresh_token_expires_at() -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC) + datetime.timedelta(
+        minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
     )
 
 
+def user_claims(username: str, user_id: int | None, token_type: str) -> Dict[str, Any]:
+    # `uid` lets handlers identify the user without loading the user row.
+    claims = {"sub": username, "type": token_type}
+    if user_id is not None:
+        claims["uid"] = user_id
+    return claims
+
+
 def generate_jwt_token(data: Dict[str, Any], expires_delta_min: int) -> str:
     to_encode = copy.deepcopy(data)
     expire = datetime.datetime.now(datetime.UTC) + datetime.timedelta(
         minutes=expires_delta_min
     )
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
+    encoded_jwt = jwt.encode(
+        to_encode,
+        settings.SECRET_KEY,
+        algorithm=JWT_ALGORITHM,
+        headers={"kid": settings.JWT_KEY_ID},
+    )
     return encoded_jwt
 
 
 def decode_jwt_token(token_encoded: str) -> Dict[str, Any] | None:
-    try:
-        return jwt.decode(
-            token_encoded, settings.SECRET_KEY, algorithms=[JWT_ALGORITHM]
-        )
-    except DecodeError:
-        return None
+    return token_verifier.verify(token_encoded)
@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import jwt
+
+from src.core import settings
+from src.core.cache import TTLCache
+
+JWT_ALGORITHM = "HS256"
+
+# Key id assumed for tokens without a `kid` header, issued before key ids.
+LEGACY_KEY_ID = "default"
+
+
+class TokenVerifier:
+    """Verifies JWTs against a set of keys identified by `kid`.
+
+    Tokens are signed with one key at a time, but every configured key is
+    accepted, so a key can be rotated without invalidating the tokens it has
+    already signed. Verified claims are remembered per token string until the
+    token expires, repeated requests with the same token skip the signature
+    check and claim parsing. Rejected tokens are never cached.
+    """
+
+    def __init__(self, keys: Dict[str, str], maxsize: int) -> None:
+        self.keys = dict(keys)
+        self._verified: TTLCache[str, Dict[str, Any]] = TTLCache(maxsize=maxsize, ttl=0)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a valid token, `None` for an invalid or expired one.
+
+        The returned claims may be shared with other callers and must not be
+        modified.
+        """
+        claims = self._verified.get(token)
+        if claims is not None:
+            # `exp` is checked by the cache, entries expire with the token.
+            with self._lock:
+                self.hits += 1
+            return claims
+
+        with self._lock:
+            self.misses += 1
+
+        claims = self._decode(token)
+        if claims is not None and isinstance(claims.get("exp"), (int, float)):
+            self._verified.set(token, claims, ttl=claims["exp"] - time.time())
+        return claims
+
+    def _decode(self, token: str) -> Optional[Dict[str, Any]]:
+        try:
+            key_id = jwt.get_unverified_header(token).get("kid", LEGACY_KEY_ID)
+            key = self.keys.get(key_id)
+            if key is None:
+                return None
+            return jwt.decode(token, key, algorithms=[JWT_ALGORITHM])
+        except jwt.InvalidTokenError:
+            # Covers malformed tokens, bad signatures and expired tokens.
+            return None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {"hits": hits, "misses": misses, "size": len(self._verified)}
+
+    def clear(self) -> None:
+        self._verified.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+token_verifier = TokenVerifier(
+    keys={**settings.JWT_VERIFICATION_KEYS, settings.JWT_KEY_ID: settings.SECRET_KEY},
+    maxsize=settings.ACCESS_TOKEN_CACHE_MAX_SIZE,
+)
@@ -0,0 +1,69 @@
+from sqlalchemy import Date, DateTime
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import functions
+from sqlalchemy.sql.expression import ClauseElement, Executable, FunctionElement
+
+from src.core.constants import StatsPeriod
+
+
+class ExplainJSON(Executable, ClauseElement):
+    """`EXPLAIN (FORMAT JSON)` of a statement, PostgreSQL only"""
+
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+@compiles(ExplainJSON, "postgresql")
+def compile_explain_json_postgresql(element, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
+
+
+@compiles(functions.now, "sqlite")
+def compile_now_sqlite(element, compiler, **kwargs) -> str:
+    # SQLite stores DATETIME as text. CURRENT_TIMESTAMP has second precision and
+    # a different layout than the values SQLAlchemy binds, which breaks ordering
+    # and comparisons against server-generated timestamps.
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+class truncate_period(FunctionElement):
+    """Date of the day, week (starting on Monday) or month a timestamp falls in.
+
+    Periods are UTC ones, the same as the days of `receipt_daily_rollup`,
+    whatever the time zone of the database session.
+    """
+
+    type = Date()
+    name = "truncate_period"
+    inherit_cache = False
+
+    def __init__(self, period: StatsPeriod, expression) -> None:
+        self.period = StatsPeriod(period)
+        super().__init__(expression)
+
+
+@compiles(truncate_period, "postgresql")
+def compile_truncate_period_postgresql(element, compiler, **kwargs) -> str:
+    expression = compiler.process(element.clauses, **kwargs)
+    # date_trunc of a timestamptz cuts at midnight of the session time zone.
+    # Dates are already UTC days and must not be shifted.
+    (argument,) = element.clauses.clauses
+    if isinstance(argument.type, DateTime) and argument.type.timezone:
+        expression = f"{expression} AT TIME ZONE 'UTC'"
+    return "CAST(date_trunc('%s', %s) AS DATE)" % (element.period.value, expression)
+
+
+SQLITE_PERIOD_FORMATS = {
+    StatsPeriod.DAY: "date(%s)",
+    StatsPeriod.WEEK: "date(%s, 'weekday 0', '-6 days')",
+    StatsPeriod.MONTH: "date(%s, 'start of month')",
+}
+
+
+@compiles(truncate_period, "sqlite")
+def compile_truncate_period_sqlite(element, compiler, **kwargs) -> str:
+    return SQLITE_PERIOD_FORMATS[element.period] % compiler.process(
+        element.clauses, **kwargs
+    )
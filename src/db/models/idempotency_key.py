@@ -0,0 +1,31 @@
+from sqlalchemy import (
+    JSON,
+    Column,
+    DateTime,
+    ForeignKey,
+    Integer,
+    LargeBinary,
+    String,
+)
+
+from src.db.session import Base
+
+
+class IdempotencyKey(Base):
+    """Response of a request made with an `Idempotency-Key` header.
+
+    The row is inserted when the request starts and holds the response once
+    it completes. While `status_code` is NULL the request is in progress.
+    """
+
+    __tablename__ = "idempotency_key"
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # SHA-256 of the request, a key cannot be reused for a different request
+    request_hash = Column(String(64), nullable=False)
+    status_code = Column(Integer)
+    response_body = Column(LargeBinary)
+    # Headers such as `Location` to replay, without `content-length`
+    response_headers = Column(JSON)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
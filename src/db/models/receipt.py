@@ -1,6 +1,18 @@
 import uuid
 
-from sqlalchemy import UUID, Column, DateTime, Enum, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    UUID,
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Enum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -12,26 +24,63 @@ class Receipt(Base):
     __tablename__ = "receipt"
 
     id = Column(Integer, primary_key=True)
-    public_id = Column(UUID(as_uuid=True), unique=True, default=uuid.uuid4, index=True)
+    public_id = Column(
+        UUID(as_uuid=True),
+        unique=True,
+        default=uuid.uuid4,
+        index=True,
+        insert_sentinel=True,
+    )
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
-    total = Column(Float, nullable=False)
-    rest = Column(Float)
+    # Amounts are in minor units (kopecks), see `src.core.money`.
+    total = Column(BigInteger, nullable=False)
+    rest = Column(BigInteger)
     payment_type = Column(Enum(PaymentType), nullable=False)
-    payment_amount = Column(Float, nullable=False)
+    payment_amount = Column(BigInteger, nullable=False)
 
     products = relationship("ReceiptProduct", back_populates="receipt")
 
+    __table_args__ = (
+        Index("ix_receipt_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_receipt_user_id_total_id", "user_id", "total", "id"),
+    )
+
 
 class ReceiptProduct(Base):
     __tablename__ = "receipt_product"
 
     id = Column(Integer, primary_key=True)
-    receipt_id = Column(Integer, ForeignKey("receipt.id"))
+    receipt_id = Column(Integer, ForeignKey("receipt.id"), index=True)
     name = Column(String, nullable=False)
-    price = Column(Float, nullable=False)
+    price = Column(BigInteger, nullable=False)
     quantity = Column(Float, nullable=False)
-    total = Column(Float)
+    total = Column(BigInteger)
 
     receipt = relationship("Receipt", back_populates="products")
+
+    __table_args__ = (
+        # Substring search on product names. SQLite has no trigram indexes and
+        # falls back to scanning with LIKE.
+        Index(
+            "ix_receipt_product_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+
+class ReceiptDailyRollup(Base):
+    """Per user, UTC day and payment type totals, kept up to date on insert"""
+
+    __tablename__ = "receipt_daily_rollup"
+
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    payment_type = Column(Enum(PaymentType), primary_key=True)
+
+    receipts_count = Column(Integer, nullable=False)
+    total_sum = Column(BigInteger, nullable=False)
+    payment_amount_sum = Column(BigInteger, nullable=False)
@@ -0,0 +1,20 @@
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, Integer
+
+from src.db.session import Base
+
+
+class RefreshToken(Base):
+    """Issued refresh tokens, one row per `jti`.
+
+    A token is used up when it is rotated, `revoked_at` is set then or when
+    its family (every token descending from one login) is revoked. Rows are
+    purged once they expire.
+    """
+
+    __tablename__ = "refresh_token"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    family_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True))
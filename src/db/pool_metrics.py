@@ -0,0 +1,92 @@
+import bisect
+import threading
+import time
+from typing import Any, Dict, Sequence
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+# Upper bounds in seconds for the time spent waiting on a pool connection.
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+        return {"buckets": buckets, "count": cumulative, "sum": total}
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self.wait_time = Histogram(WAIT_TIME_BUCKETS)
+        self.timeouts = 0
+        self.max_checked_out = 0
+
+    def snapshot(self, pool: QueuePool) -> Dict[str, Any]:
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_checked_out": self.max_checked_out,
+            "timeouts": self.timeouts,
+            "wait_time_seconds": self.wait_time.snapshot(),
+        }
+
+
+class InstrumentedPoolMixin:
+    """Records how long callers wait for a connection and how often they give up"""
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.wait_time.observe(time.perf_counter() - started)
+
+        self.metrics.max_checked_out = max(
+            self.metrics.max_checked_out, self.checkedout()
+        )
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncAdaptedQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_snapshot(pool: Pool) -> Dict[str, Any]:
+    if isinstance(pool, InstrumentedPoolMixin):
+        return pool.metrics.snapshot(pool)
+    return {"status": pool.status()}
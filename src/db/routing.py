@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.core import settings
+from src.core.cache import TTLCache
+
+# `Session.info` key that sends every statement of a session to the primary.
+USE_PRIMARY = "use_primary"
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica and writes to the primary.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary, other
+    statements use the replica unless the session is pinned to the primary.
+    """
+
+    def __init__(self, primary_bind: Engine, replica_bind: Engine, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.primary_bind = primary_bind
+        self.replica_bind = replica_bind
+        self._executing_dml = False
+
+    def execute(self, statement, *args, **kwargs):
+        # ORM bulk inserts ask for a bind with the mapper only, not the
+        # statement, so DML is flagged for the duration of the call.
+        if not getattr(statement, "is_dml", False):
+            return super().execute(statement, *args, **kwargs)
+
+        self._executing_dml = True
+        try:
+            return super().execute(statement, *args, **kwargs)
+        finally:
+            self._executing_dml = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> Engine:
+        if (
+            self.info.get(USE_PRIMARY)
+            or self._flushing
+            or self._executing_dml
+            or (clause is not None and clause.is_dml)
+        ):
+            return self.primary_bind
+        return self.replica_bind
+
+
+def _sync_session(db_session: Session | AsyncSession) -> Session:
+    if isinstance(db_session, AsyncSession):
+        return db_session.sync_session
+    return db_session
+
+
+def reads_from_replica(db_session: Session | AsyncSession) -> bool:
+    db_session = _sync_session(db_session)
+    return isinstance(db_session, RoutingSession) and not db_session.info.get(
+        USE_PRIMARY
+    )
+
+
+def use_primary(db_session: Session | AsyncSession) -> None:
+    """Send all further statements of the session to the primary"""
+    _sync_session(db_session).info[USE_PRIMARY] = True
+
+
+@contextmanager
+def primary_reads(db_session: Session | AsyncSession) -> Iterator[None]:
+    info = _sync_session(db_session).info
+    previous = info.get(USE_PRIMARY, False)
+    info[USE_PRIMARY] = True
+    try:
+        yield
+    finally:
+        info[USE_PRIMARY] = previous
+
+
+class RecentWrites:
+    """Keys that wrote recently, whose reads should not see replica lag.
+
+    A key stays marked for `window` seconds after its last write, which should
+    exceed the usual replication lag.
+    """
+
+    def __init__(self, maxsize: int, window: float) -> None:
+        self._keys: TTLCache[Hashable, bool] = TTLCache(maxsize=maxsize, ttl=window)
+
+    def mark(self, key: Hashable) -> None:
+        self._keys.set(key, True)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._keys.get(key, False)
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+
+recent_writes = RecentWrites(
+    maxsize=settings.READ_YOUR_WRITES_MAX_USERS,
+    window=settings.READ_YOUR_WRITES_SECONDS,
+)
@@ -0,0 +1,66 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+T = TypeVar("T")
+
+
+class SessionRunner(ABC):
+    """Runs blocking ORM code for a request without blocking the event loop.
+
+    Repositories are written once against a synchronous `Session`. The runner
+    owns that session and decides how calls into it are executed.
+    """
+
+    session: Session
+
+    @staticmethod
+    def for_session(db_session: Session | AsyncSession) -> "SessionRunner":
+        if isinstance(db_session, AsyncSession):
+            return AsyncSessionRunner(db_session)
+        return ThreadPoolSessionRunner(db_session)
+
+    @abstractmethod
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        pass
+
+    @abstractmethod
+    def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        """Advance a blocking iterator, such as a streamed query, item by item"""
+
+
+class ThreadPoolSessionRunner(SessionRunner):
+    """Executes calls on a worker thread, for blocking DBAPI drivers"""
+
+    def __init__(self, db_session: Session) -> None:
+        self.session = db_session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+    def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        return iterate_in_threadpool(iterator)
+
+
+class AsyncSessionRunner(SessionRunner):
+    """Executes calls in a greenlet on the event loop, for asyncio drivers"""
+
+    def __init__(self, async_session: AsyncSession) -> None:
+        self.async_session = async_session
+        self.session = async_session.sync_session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await self.async_session.run_sync(lambda _: fn(*args, **kwargs))
+
+    async def iterate(self, iterator: Iterator[T]) -> AsyncIterator[T]:
+        exhausted = object()
+        while True:
+            item = await self.async_session.run_sync(
+                lambda _: next(iterator, exhausted)
+            )
+            if item is exhausted:
+                return
+            yield item
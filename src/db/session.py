@@ -1,9 +1,105 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict, Optional
+
+from sqlalchemy import URL, Engine, create_engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import Pool
 
 from src.core import settings
+from src.db import functions  # noqa: F401
+from src.db.pool_metrics import (
+    InstrumentedAsyncAdaptedQueuePool,
+    InstrumentedQueuePool,
+)
+from src.db.routing import RoutingSession
+
+
+def get_pool_options(url: URL, poolclass: type[Pool]) -> Dict[str, Any]:
+    # SQLite gets its dialect-specific pool, sizing options do not apply there.
+    if url.get_backend_name() == "sqlite":
+        return {}
+
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_async_database_url(
+    database_url: str, async_database_url: Optional[str] = None
+) -> URL:
+    if async_database_url:
+        return make_url(async_database_url)
+    return make_url(database_url).set(drivername="postgresql+asyncpg")
+
+
+def create_sync_engine(url: str) -> Engine:
+    url = make_url(url)
+    return create_engine(url, **get_pool_options(url, InstrumentedQueuePool))
 
-engine = create_engine(settings.DATABASE_URL)
+
+def create_asyncio_engine(url: URL) -> AsyncEngine:
+    return create_async_engine(
+        url, **get_pool_options(url, InstrumentedAsyncAdaptedQueuePool)
+    )
+
+
+def create_async_session_factory(bind: AsyncEngine) -> async_sessionmaker:
+    # An AsyncSession cannot lazily reload objects expired by a commit, the
+    # first attribute access after one would fail.
+    return async_sessionmaker(autoflush=False, bind=bind, expire_on_commit=False)
+
+
+engine = create_sync_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request sessions read from the replica when one is configured. SessionLocal
+# stays on the primary for maintenance work.
+read_engine = None
+RoutingSessionLocal = SessionLocal
+if settings.DATABASE_READ_URL:
+    read_engine = create_sync_engine(settings.DATABASE_READ_URL)
+    RoutingSessionLocal = sessionmaker(
+        class_=RoutingSession,
+        primary_bind=engine,
+        replica_bind=read_engine,
+        autocommit=False,
+        autoflush=False,
+        # Reloading committed objects would read them back from a lagging
+        # replica.
+        expire_on_commit=False,
+    )
+
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncRoutingSessionLocal = None
+if settings.DATABASE_ASYNC_ENABLED:
+    async_engine = create_asyncio_engine(
+        get_async_database_url(settings.DATABASE_URL, settings.DATABASE_ASYNC_URL)
+    )
+    AsyncSessionLocal = create_async_session_factory(async_engine)
+    AsyncRoutingSessionLocal = AsyncSessionLocal
+    if settings.DATABASE_READ_URL:
+        async_read_engine = create_asyncio_engine(
+            get_async_database_url(
+                settings.DATABASE_READ_URL, settings.DATABASE_READ_ASYNC_URL
+            )
+        )
+        AsyncRoutingSessionLocal = async_sessionmaker(
+            sync_session_class=RoutingSession,
+            primary_bind=async_engine.sync_engine,
+            replica_bind=async_read_engine.sync_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
 Base = declarative_base()
@@ -1,26 +1,53 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from src.db.routing import recent_writes, use_primary
 from src.dependencies.db import get_db_session
+from src.domain.models import UserEntity
 from src.services.auth import AuthService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_auth_service(db_session: Session = Depends(get_db_session)) -> AuthService:
+def get_auth_service(
+    db_session: Session | AsyncSession = Depends(get_db_session),
+) -> AuthService:
     return AuthService.create(db_session)
 
 
-def get_current_user(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
     auth_service: AuthService = Depends(get_auth_service),
-):
-    user = auth_service.verify_access_token(token)
+) -> UserEntity:
+    user = await auth_service.verify_access_token(token)
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise credentials_exception()
     return user
+
+
+async def get_current_user_id(
+    token: str = Depends(oauth2_scheme),
+    auth_service: AuthService = Depends(get_auth_service),
+    db_session: Session | AsyncSession = Depends(get_db_session),
+) -> int:
+    user_id = auth_service.get_user_id_from_access_token(token)
+    if user_id is None:
+        # Tokens issued before `uid` was added to the claims need the user lookup.
+        user = await get_current_user(token, auth_service)
+        user_id = user.id
+
+    # The request shares this session with the services it uses. Users that
+    # just wrote read from the primary so they never miss their own writes.
+    if user_id in recent_writes:
+        use_primary(db_session)
+    return user_id
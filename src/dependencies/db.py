@@ -1,11 +1,36 @@
-from typing import Generator
+from typing import AsyncGenerator, Callable, Generator
 
-from src.db.session import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
+from src.core import settings
+from src.db.session import AsyncRoutingSessionLocal, RoutingSessionLocal
 
-def get_db_session() -> Generator[SessionLocal, None, None]:
-    db = SessionLocal()
+
+def get_sync_db_session() -> Generator[Session, None, None]:
+    db = RoutingSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncRoutingSessionLocal() as db:
+        yield db
+
+
+get_db_session = (
+    get_async_db_session if settings.DATABASE_ASYNC_ENABLED else get_sync_db_session
+)
+
+
+def get_db_session_factory() -> Callable[[], Session | AsyncSession]:
+    """Session factory for work that outlives the route handler.
+
+    Sessions from `get_db_session` are closed as soon as the handler returns,
+    before a streaming response body is sent.
+    """
+    if settings.DATABASE_ASYNC_ENABLED:
+        return AsyncRoutingSessionLocal
+    return RoutingSessionLocal
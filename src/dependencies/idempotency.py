@@ -0,0 +1,25 @@
+from typing import Optional
+
+from fastapi import Depends, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.dependencies.db import get_db_session
+from src.services.idempotency import IdempotencyService
+
+
+def get_idempotency_service(
+    db_session: Session | AsyncSession = Depends(get_db_session),
+) -> IdempotencyService:
+    return IdempotencyService.create(db_session)
+
+
+def get_idempotency_key(
+    idempotency_key: Optional[str] = Header(
+        None,
+        min_length=1,
+        max_length=255,
+        description="Retries with the same key return the first response",
+    ),
+) -> Optional[str]:
+    return idempotency_key
@@ -0,0 +1,22 @@
+import hmac
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from src.core import settings
+
+
+def verify_internal_token(
+    x_internal_token: Optional[str] = Header(
+        None, description="Shared secret of the internal API"
+    ),
+) -> None:
+    expected_token = settings.INTERNAL_API_TOKEN
+    if (
+        not expected_token
+        or x_internal_token is None
+        or not hmac.compare_digest(x_internal_token.encode(), expected_token.encode())
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid internal API token"
+        )
@@ -1,11 +1,68 @@
-from fastapi import Depends
+import datetime
+from typing import Callable, Optional
+
+from fastapi import Depends, Header, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.dependencies.db import get_db_session
+from src.core import settings
+from src.core.constants import PaymentType
+from src.core.money import MAX_AMOUNT, to_minor_units
+from src.dependencies.db import get_db_session, get_db_session_factory
+from src.domain.models import ReceiptFilters
 from src.services.receipt import ReceiptService
+from src.services.receipt_export import ReceiptExporter
 
 
 def get_receipt_service(
-    db_session: Session = Depends(get_db_session),
+    db_session: Session | AsyncSession = Depends(get_db_session),
 ) -> ReceiptService:
     return ReceiptService.create(db_session)
+
+
+def get_receipt_exporter(
+    session_factory: Callable[[], Session | AsyncSession] = Depends(
+        get_db_session_factory
+    ),
+) -> ReceiptExporter:
+    return ReceiptExporter(session_factory)
+
+
+def get_receipt_filters(
+    created_after: Optional[datetime.datetime] = None,
+    created_before: Optional[datetime.datetime] = None,
+    minimum_total: Optional[float] = Query(None, ge=0, le=MAX_AMOUNT),
+    maximum_total: Optional[float] = Query(None, ge=0, le=MAX_AMOUNT),
+    payment_type: Optional[PaymentType] = None,
+    product: Optional[str] = Query(
+        None, min_length=1, description="Part of a product name, case-insensitive"
+    ),
+) -> ReceiptFilters:
+    return ReceiptFilters(
+        created_after=created_after,
+        created_before=created_before,
+        minimum_total=(
+            None if minimum_total is None else to_minor_units(minimum_total)
+        ),
+        maximum_total=(
+            None if maximum_total is None else to_minor_units(maximum_total)
+        ),
+        payment_type=payment_type,
+        product_name=product,
+    )
+
+
+def get_respond_async(
+    prefer: Optional[str] = Header(
+        None,
+        description="`respond-async` queues new receipts and answers `202 Accepted`",
+    ),
+) -> bool:
+    """Whether the client prefers write-behind creation and it is enabled"""
+    if prefer is None or not settings.RECEIPT_WRITE_BEHIND_ENABLED:
+        return False
+    # RFC 7240: comma separated preferences, each with optional parameters.
+    return any(
+        preference.split(";")[0].strip().lower() == "respond-async"
+        for preference in prefer.split(",")
+    )
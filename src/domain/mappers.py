@@ -1,5 +1,23 @@
+from typing import Iterable, List
+
+from sqlalchemy import Row
+
+from src.core.money import from_minor_units
 from src.db.models.receipt import Receipt
-from src.domain.models import PaymentEntity, ProductEntity, ReceiptEntity
+from src.db.models.user import User
+from src.domain.models import (
+    PaymentEntity,
+    ProductEntity,
+    ReceiptEntity,
+    ReceiptPayload,
+    UserEntity,
+)
+
+
+def map_user_db_to_entity(user_db_obj: User) -> UserEntity:
+    return UserEntity(
+        id=user_db_obj.id, username=user_db_obj.username, name=user_db_obj.name
+    )
 
 
 def map_receipt_db_to_entity(receipt_db_obj: Receipt) -> ReceiptEntity:
@@ -7,10 +25,10 @@ def map_receipt_db_to_entity(receipt_db_obj: Receipt) -> ReceiptEntity:
         id=receipt_db_obj.id,
         public_id=receipt_db_obj.public_id,
         user_id=receipt_db_obj.user_id,
-        products=[
+        products=tuple(
             ProductEntity(name=p.name, price=p.price, quantity=p.quantity)
             for p in receipt_db_obj.products
-        ],
+        ),
         payment=PaymentEntity(
             amount=receipt_db_obj.payment_amount, type=receipt_db_obj.payment_type
         ),
@@ -18,3 +36,33 @@ def map_receipt_db_to_entity(receipt_db_obj: Receipt) -> ReceiptEntity:
         rest=receipt_db_obj.rest,
         created_at=receipt_db_obj.created_at,
     )
+
+
+def map_receipt_row_to_payload(
+    receipt_row: Row, product_rows: Iterable[Row]
+) -> ReceiptPayload:
+    """Response payload from `RECEIPT_COLUMNS` and `PRODUCT_COLUMNS` rows"""
+    return {
+        "id": receipt_row.id,
+        "public_id": receipt_row.public_id,
+        "total": from_minor_units(receipt_row.total),
+        "rest": from_minor_units(receipt_row.rest),
+        "products": map_product_rows_to_payload(product_rows),
+        "payment": {
+            "type": receipt_row.payment_type,
+            "amount": from_minor_units(receipt_row.payment_amount),
+        },
+        "created_at": receipt_row.created_at,
+    }
+
+
+def map_product_rows_to_payload(product_rows: Iterable[Row]) -> List[dict]:
+    return [
+        {
+            "name": row.name,
+            "price": from_minor_units(row.price),
+            "quantity": row.quantity,
+            "total": from_minor_units(row.price * row.quantity),
+        }
+        for row in product_rows
+    ]
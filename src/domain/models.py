@@ -1,65 +1,152 @@
+import dataclasses
 import datetime
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, List, Tuple
 from uuid import UUID
 
-from src.core.constants import PaymentType
+from src.core.constants import PaymentType, ReceiptIngestionStatus
+from src.core.money import from_minor_units
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
+class UserEntity:
+    id: int
+    username: str
+    name: str
+
+
+# Amounts of money in entities are integer minor units (kopecks), `to_dict`
+# converts them for the API.
+
+
+@dataclass(frozen=True, slots=True)
 class ProductEntity:
     name: str
-    price: float
+    price: int
     quantity: int
 
     @property
-    def total(self) -> float:
+    def total(self) -> int:
         return self.price * self.quantity
 
     def to_dict(self) -> dict:
         return {
             "name": self.name,
-            "price": self.price,
+            "price": from_minor_units(self.price),
             "quantity": self.quantity,
-            "total": self.total,
+            "total": from_minor_units(self.total),
         }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PaymentEntity:
-    amount: float
+    amount: int
     type: str
 
     def to_dict(self) -> dict:
-        return {"type": self.type, "amount": self.amount}
+        return {"type": self.type, "amount": from_minor_units(self.amount)}
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ReceiptEntity:
     user_id: int
-    products: List[ProductEntity]
+    products: Tuple[ProductEntity, ...]
     payment: PaymentEntity
-    total: float = 0
-    rest: float = 0
+    total: int = 0
+    rest: int = 0
     id: int | None = None
     public_id: UUID | None = None
     created_at: datetime.datetime | None = None
 
-    def calculate_total(self):
-        self.total = sum(product.total for product in self.products)
-        self.rest = (
-            self.payment.amount - self.total
-            if self.payment.type == PaymentType.CASH
-            else 0
+    def with_totals(self) -> "ReceiptEntity":
+        total = sum(product.total for product in self.products)
+        rest = (
+            self.payment.amount - total if self.payment.type == PaymentType.CASH else 0
         )
+        return dataclasses.replace(self, total=total, rest=rest)
 
     def to_dict(self) -> dict:
         return {
             "id": self.id,
             "public_id": self.public_id,
-            "total": self.total,
-            "rest": self.rest,
+            "total": from_minor_units(self.total),
+            "rest": from_minor_units(self.rest),
             "products": [product.to_dict() for product in self.products],
             "payment": self.payment.to_dict(),
             "created_at": self.created_at,
         }
+
+
+@dataclass(frozen=True)
+class ReceiptFilters:
+    created_after: datetime.datetime | None = None
+    created_before: datetime.datetime | None = None
+    minimum_total: int | None = None
+    maximum_total: int | None = None
+    payment_type: PaymentType | None = None
+    product_name: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class ReceiptStats:
+    receipts_count: int
+    revenue: int
+    average_ticket: float | None
+    period: datetime.date | None = None
+    payment_type: PaymentType | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "period": self.period,
+            "payment_type": self.payment_type,
+            "receipts_count": self.receipts_count,
+            "revenue": from_minor_units(self.revenue),
+            "average_ticket": (
+                None
+                if self.average_ticket is None
+                else from_minor_units(round(self.average_ticket))
+            ),
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ProductStats:
+    name: str
+    quantity: float
+    revenue: int
+    receipts_count: int
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "quantity": self.quantity,
+            "revenue": from_minor_units(self.revenue),
+            "receipts_count": self.receipts_count,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class ReceiptStatus:
+    public_id: UUID
+    status: ReceiptIngestionStatus
+    id: int | None = None
+    error: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "public_id": self.public_id,
+            "status": self.status,
+            "id": self.id,
+            "error": self.error,
+        }
+
+
+# Response-ready receipt, built straight from database rows on the read path.
+ReceiptPayload = Dict[str, Any]
+
+
+@dataclass
+class ReceiptPage:
+    receipts: List[ReceiptPayload]
+    total_count: int | None = None
+    next_cursor: str | None = None
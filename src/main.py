@@ -1,17 +1,105 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Sequence
+
 import uvicorn
 from fastapi import FastAPI
 
-from src.api.routes import auth_routes, receipt_routes
+from src.api.rate_limit import RateLimit, RateLimitMiddleware, rate_limiter
+from src.api.routes import (
+    auth_routes,
+    internal_routes,
+    product_routes,
+    receipt_routes,
+)
+from src.commands.purge_idempotency_keys import purge_expired_idempotency_keys
+from src.commands.purge_refresh_tokens import purge_expired_refresh_tokens
+from src.core import settings
+from src.core.constants import RateLimitKey
+from src.core.password_hashing import password_hasher
+from src.core.periodic import run_periodically
+from src.services.receipt_ingestion import receipt_ingestion_worker
+from src.services.receipt_queue import receipt_queue
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    background_tasks = [
+        asyncio.create_task(run_periodically(interval, purge))
+        for interval, purge in (
+            (
+                settings.REFRESH_TOKEN_PURGE_INTERVAL_SECONDS,
+                purge_expired_refresh_tokens,
+            ),
+            (
+                settings.IDEMPOTENCY_KEY_PURGE_INTERVAL_SECONDS,
+                purge_expired_idempotency_keys,
+            ),
+        )
+    ]
+    # Receipts left in the queue by a previous run are stored first thing.
+    if settings.RECEIPT_WRITE_BEHIND_ENABLED:
+        background_tasks.append(
+            asyncio.create_task(
+                receipt_ingestion_worker.run(
+                    poll_interval=settings.RECEIPT_QUEUE_POLL_SECONDS,
+                    retry_interval=settings.RECEIPT_QUEUE_RETRY_SECONDS,
+                )
+            )
+        )
+    yield
+    for background_task in background_tasks:
+        background_task.cancel()
+    password_hasher.shutdown()
+    receipt_queue.close()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
 
 
-def include_api_router(router, prefix: str, tags: list):
+def include_api_router(
+    router, prefix: str, tags: list, rate_limits: Sequence[RateLimit] = ()
+):
+    first_route = len(app.router.routes)
     app.include_router(router, prefix=f"/api{prefix}", tags=tags)
+    if rate_limits and settings.RATE_LIMIT_ENABLED:
+        rate_limiter.limit_routes(
+            group=",".join(tags),
+            routes=app.router.routes[first_route:],
+            limits=rate_limits,
+        )
 
 
-include_api_router(auth_routes.router, prefix="/auth", tags=["auth"])
-include_api_router(receipt_routes.router, prefix="", tags=["receipts"])
+include_api_router(
+    auth_routes.router,
+    prefix="/auth",
+    tags=["auth"],
+    rate_limits=[
+        RateLimit(
+            settings.AUTH_RATE_LIMIT_PER_MINUTE,
+            seconds=60,
+            key=RateLimitKey.IP,
+            methods=frozenset({"POST"}),
+        )
+    ],
+)
+include_api_router(
+    receipt_routes.router,
+    prefix="",
+    tags=["receipts"],
+    rate_limits=[
+        RateLimit(
+            settings.RECEIPT_CREATE_RATE_LIMIT_PER_MINUTE,
+            seconds=60,
+            key=RateLimitKey.USER,
+            methods=frozenset({"POST"}),
+        )
+    ],
+)
+include_api_router(product_routes.router, prefix="", tags=["products"])
+if settings.INTERNAL_API_ENABLED:
+    include_api_router(internal_routes.router, prefix="/internal", tags=["internal"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+import datetime
+from typing import Dict
+
+from sqlalchemy import Row, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.db.models.idempotency_key import IdempotencyKey
+from src.db.routing import primary_reads
+from src.db.runner import SessionRunner
+
+
+class IdempotencyKeyRepository:
+    def __init__(self, session: Session) -> None:
+        self.__session = session
+
+    def reserve(
+        self,
+        user_id: int,
+        key: str,
+        request_hash: str,
+        expires_at: datetime.datetime,
+    ) -> Row | None:
+        """Claim a key for a request about to run.
+
+        Returns `None` when the key was claimed, otherwise the row of the
+        request that holds it. Expired rows are replaced. The primary key makes
+        only one of concurrent requests with the same key win.
+        """
+        while True:
+            now = datetime.datetime.now(datetime.UTC)
+            self.__session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.user_id == user_id,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.expires_at <= now,
+                )
+            )
+            try:
+                self.__session.execute(
+                    insert(IdempotencyKey).values(
+                        user_id=user_id,
+                        key=key,
+                        request_hash=request_hash,
+                        expires_at=expires_at,
+                    )
+                )
+                self.__session.commit()
+                return None
+            except IntegrityError:
+                self.__session.rollback()
+
+            # A replica may not have the row yet, it was written moments ago.
+            with primary_reads(self.__session):
+                holder = self.__session.execute(
+                    select(
+                        IdempotencyKey.request_hash,
+                        IdempotencyKey.status_code,
+                        IdempotencyKey.response_body,
+                        IdempotencyKey.response_headers,
+                    ).where(
+                        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+                    )
+                ).first()
+            # Otherwise the holder was released in the meantime, claim again.
+            if holder is not None:
+                return holder
+
+    def complete(
+        self,
+        user_id: int,
+        key: str,
+        status_code: int,
+        response_body: bytes,
+        response_headers: Dict[str, str],
+        expires_at: datetime.datetime,
+    ) -> None:
+        """Store the response, committing it with whatever the request wrote"""
+        self.__session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(
+                status_code=status_code,
+                response_body=response_body,
+                response_headers=response_headers,
+                expires_at=expires_at,
+            )
+        )
+        self.__session.commit()
+
+    def release(self, user_id: int, key: str) -> None:
+        """Give up a claimed key after its request failed, so it can be retried"""
+        # Discards what the request wrote, it may also have left the
+        # transaction unusable.
+        self.__session.rollback()
+        self.__session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status_code.is_(None),
+            )
+        )
+        self.__session.commit()
+
+    def purge_expired(self) -> int:
+        result = self.__session.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.expires_at < datetime.datetime.now(datetime.UTC)
+            )
+        )
+        self.__session.commit()
+        return result.rowcount
+
+
+class AsyncIdempotencyKeyRepository:
+    """Non-blocking facade over `IdempotencyKeyRepository` for request handlers"""
+
+    def __init__(self, runner: SessionRunner) -> None:
+        self.__runner = runner
+        self.__repository = IdempotencyKeyRepository(runner.session)
+
+    async def reserve(
+        self,
+        user_id: int,
+        key: str,
+        request_hash: str,
+        expires_at: datetime.datetime,
+    ) -> Row | None:
+        return await self.__runner.run(
+            self.__repository.reserve, user_id, key, request_hash, expires_at
+        )
+
+    async def complete(
+        self,
+        user_id: int,
+        key: str,
+        status_code: int,
+        response_body: bytes,
+        response_headers: Dict[str, str],
+        expires_at: datetime.datetime,
+    ) -> None:
+        await self.__runner.run(
+            self.__repository.complete,
+            user_id,
+            key,
+            status_code,
+            response_body,
+            response_headers,
+            expires_at,
+        )
+
+    async def release(self, user_id: int, key: str) -> None:
+        await self.__runner.run(self.__repository.release, user_id, key)
@@ -0,0 +1,60 @@
+import base64
+import datetime
+import json
+from dataclasses import dataclass
+
+from src.core.constants import ReceiptSortField, SortDirection
+
+
+class InvalidCursorError(ValueError):
+    def __init__(self, cursor: str) -> None:
+        self.cursor = cursor
+        self.message = "Invalid pagination cursor"
+        super().__init__(self.message)
+
+
+@dataclass(frozen=True)
+class ReceiptCursor:
+    """Position right after the last receipt of a page.
+
+    Receipts are ordered by `(sort_field, id)` in `direction`. The cursor keeps
+    the order it was issued for, so following pages continue in that order.
+    """
+
+    value: datetime.datetime | int
+    id: int
+    sort_field: ReceiptSortField = ReceiptSortField.CREATED_AT
+    direction: SortDirection = SortDirection.ASC
+
+    def encode(self) -> str:
+        value = (
+            self.value.isoformat()
+            if self.sort_field == ReceiptSortField.CREATED_AT
+            else self.value
+        )
+        raw = json.dumps(
+            [self.sort_field.value, self.direction.value, value, self.id],
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, cursor: str) -> "ReceiptCursor":
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            sort_field, direction, value, receipt_id = json.loads(
+                base64.urlsafe_b64decode(padded)
+            )
+            sort_field = ReceiptSortField(sort_field)
+            return cls(
+                value=(
+                    datetime.datetime.fromisoformat(value)
+                    if sort_field == ReceiptSortField.CREATED_AT
+                    else int(value)
+                ),
+                id=int(receipt_id),
+                sort_field=sort_field,
+                direction=SortDirection(direction),
+            )
+        except (ValueError, TypeError):
+            raise InvalidCursorError(cursor)
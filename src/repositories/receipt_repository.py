@@ -1,87 +1,543 @@
-import datetime
-from typing import Optional, Tuple
+import dataclasses
+import json
+import uuid
+from collections import defaultdict
+from enum import Enum as PyEnum
+from typing import AsyncIterator, Callable, Iterator, List, Optional, TypeVar
+from uuid import UUID
 
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, func, insert, select, tuple_
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
 
-from src.core.constants import PaymentType
+from src.core.constants import (
+    PaginationMode,
+    ReceiptSortField,
+    SortDirection,
+    StatsPeriod,
+)
+from src.db.functions import ExplainJSON, truncate_period
 from src.db.models.receipt import Receipt, ReceiptProduct
-from src.domain.mappers import map_receipt_db_to_entity
-from src.domain.models import ReceiptEntity
+from src.db.routing import primary_reads, reads_from_replica
+from src.db.runner import SessionRunner
+from src.domain.mappers import map_receipt_db_to_entity, map_receipt_row_to_payload
+from src.domain.models import (
+    ProductStats,
+    ReceiptEntity,
+    ReceiptFilters,
+    ReceiptPage,
+    ReceiptPayload,
+    ReceiptStats,
+)
+from src.repositories.pagination import ReceiptCursor
+from src.repositories.receipt_rollup_repository import ReceiptRollupRepository
+
+T = TypeVar("T")
+
+# Columns read by the list/get endpoints. They are fetched as plain rows and
+# turned into response payloads without going through ORM objects.
+RECEIPT_COLUMNS = (
+    Receipt.id,
+    Receipt.public_id,
+    Receipt.total,
+    Receipt.rest,
+    Receipt.payment_type,
+    Receipt.payment_amount,
+    Receipt.created_at,
+)
+PRODUCT_COLUMNS = (
+    ReceiptProduct.receipt_id,
+    ReceiptProduct.name,
+    ReceiptProduct.price,
+    ReceiptProduct.quantity,
+)
+
+SORT_COLUMNS = {
+    ReceiptSortField.CREATED_AT: Receipt.created_at,
+    ReceiptSortField.TOTAL: Receipt.total,
+}
+
+
+def contains_pattern(value: str) -> str:
+    """LIKE pattern matching `value` anywhere, with wildcards in it escaped"""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class ProductsLoading(str, PyEnum):
+    # One extra `SELECT ... WHERE receipt_id IN (...)` per query, best for pages.
+    SELECTIN = "selectin"
+    # Products come back in the same statement, best for single receipts.
+    JOINED = "joined"
+
+
+def products_loader_option(loading: ProductsLoading) -> LoaderOption:
+    if loading == ProductsLoading.JOINED:
+        return joinedload(Receipt.products)
+    return selectinload(Receipt.products)
 
 
 class ReceiptRepository:
     def __init__(self, db_session: Session):
         self.session = db_session
+        self.rollups = ReceiptRollupRepository(db_session)
 
-    def save_receipt(self, receipt_entity: ReceiptEntity) -> ReceiptEntity:
-        receipt_model_obj = Receipt(
-            user_id=receipt_entity.user_id,
-            total=receipt_entity.total,
-            rest=receipt_entity.rest,
-            payment_type=receipt_entity.payment.type,
-            payment_amount=receipt_entity.payment.amount,
-            products=[
-                ReceiptProduct(
-                    name=product.name,
-                    price=product.price,
-                    quantity=product.quantity,
-                    total=product.total,
-                )
-                for product in receipt_entity.products
+    def _query_receipts(self, loading: ProductsLoading) -> Query:
+        return self.session.query(Receipt).options(products_loader_option(loading))
+
+    def save_receipt(
+        self, receipt_entity: ReceiptEntity, commit: bool = True
+    ) -> ReceiptEntity:
+        return self.save_receipts([receipt_entity], commit)[0]
+
+    def save_receipts(
+        self, receipt_entities: List[ReceiptEntity], commit: bool = True
+    ) -> List[ReceiptEntity]:
+        """Insert many receipts in one transaction with batched statements.
+
+        Receipts go in with a single `INSERT ... RETURNING` that hands back the
+        server-generated values in parameter order, their products with one
+        executemany, so no row is refreshed afterwards. Daily rollups are
+        updated in the same transaction.
+
+        Receipts accepted earlier keep their `created_at`, either all or none of
+        the receipts of a call have one. With `commit=False` the transaction is
+        left open for the caller to commit along with writes of its own.
+        """
+        public_ids = [entity.public_id or uuid.uuid4() for entity in receipt_entities]
+        inserted_rows = self.session.execute(
+            insert(Receipt).returning(
+                Receipt.id,
+                Receipt.created_at,
+                sort_by_parameter_order=True,
+            ),
+            [
+                {
+                    "public_id": public_id,
+                    "user_id": entity.user_id,
+                    "total": entity.total,
+                    "rest": entity.rest,
+                    "payment_type": entity.payment.type,
+                    "payment_amount": entity.payment.amount,
+                    **(
+                        {"created_at": entity.created_at}
+                        if entity.created_at is not None
+                        else {}
+                    ),
+                }
+                for entity, public_id in zip(receipt_entities, public_ids)
             ],
-        )
+        ).all()
 
-        self.session.add(receipt_model_obj)
-        self.session.commit()
-        self.session.refresh(receipt_model_obj)
+        product_rows = [
+            {
+                "receipt_id": receipt_id,
+                "name": product.name,
+                "price": product.price,
+                "quantity": product.quantity,
+                "total": product.total,
+            }
+            for entity, (receipt_id, _) in zip(receipt_entities, inserted_rows)
+            for product in entity.products
+        ]
+        if product_rows:
+            self.session.execute(insert(ReceiptProduct), product_rows)
 
-        return map_receipt_db_to_entity(receipt_model_obj)
+        saved_entities = [
+            dataclasses.replace(
+                entity, id=receipt_id, public_id=public_id, created_at=created_at
+            )
+            for entity, public_id, (receipt_id, created_at) in zip(
+                receipt_entities, public_ids, inserted_rows
+            )
+        ]
+        self.rollups.add_receipts(saved_entities)
 
-    def get_receipt_by_id(self, receipt_id: int, user_id: int) -> ReceiptEntity | None:
-        receipt_model_obj: Receipt | None = (
-            self.session.query(Receipt)
-            .filter(Receipt.id == receipt_id, Receipt.user_id == user_id)
-            .first()
-        )
-        if not receipt_model_obj:
+        if commit:
+            self.session.commit()
+
+        return saved_entities
+
+    def get_receipt_by_id(self, receipt_id: int, user_id: int) -> ReceiptPayload | None:
+        return self._read_your_writes(self._get_receipt_by_id, receipt_id, user_id)
+
+    def _get_receipt_by_id(
+        self, receipt_id: int, user_id: int
+    ) -> ReceiptPayload | None:
+        rows = self.session.execute(
+            select(*RECEIPT_COLUMNS, *PRODUCT_COLUMNS)
+            .outerjoin(ReceiptProduct, ReceiptProduct.receipt_id == Receipt.id)
+            .where(Receipt.id == receipt_id, Receipt.user_id == user_id)
+            .order_by(ReceiptProduct.id)
+        ).all()
+        if not rows:
             return
 
-        return map_receipt_db_to_entity(receipt_model_obj)
+        # The outer join yields one row without product columns for a receipt
+        # that has no products.
+        product_rows = [row for row in rows if row.receipt_id is not None]
+        return map_receipt_row_to_payload(rows[0], product_rows)
+
+    def _read_your_writes(self, lookup: Callable[..., T | None], *args) -> T | None:
+        """Repeat a lookup that found nothing on the replica against the primary.
+
+        Receipts are immutable, so a miss is the only way replication lag shows
+        for a single receipt, e.g. when it is requested right after creation.
+        """
+        found = lookup(*args)
+        if found is None and reads_from_replica(self.session):
+            with primary_reads(self.session):
+                found = lookup(*args)
+        return found
+
+    def _filtered_query(self, user_id: int, filters: ReceiptFilters) -> Query:
+        query = self.session.query(Receipt).filter(Receipt.user_id == user_id)
+
+        if filters.created_after is not None:
+            query = query.filter(Receipt.created_at >= filters.created_after)
+
+        if filters.created_before is not None:
+            query = query.filter(Receipt.created_at < filters.created_before)
+
+        if filters.minimum_total is not None:
+            query = query.filter(Receipt.total >= filters.minimum_total)
+
+        if filters.maximum_total is not None:
+            query = query.filter(Receipt.total <= filters.maximum_total)
+
+        if filters.payment_type:
+            query = query.filter(Receipt.payment_type == filters.payment_type)
+
+        if filters.product_name:
+            query = query.filter(
+                Receipt.products.any(
+                    ReceiptProduct.name.ilike(
+                        contains_pattern(filters.product_name), escape="\\"
+                    )
+                )
+            )
+
+        return query
+
+    def count_receipts(self, user_id: int, filters: ReceiptFilters) -> int:
+        query = self._filtered_query(user_id, filters)
+        return int(query.with_entities(func.count()).scalar())
+
+    def estimate_receipts_count(
+        self, user_id: int, filters: ReceiptFilters
+    ) -> int | None:
+        """Row estimate from the PostgreSQL planner, `None` on other databases"""
+        if self.session.get_bind().dialect.name != "postgresql":
+            return None
+
+        statement = self._filtered_query(user_id, filters).with_entities(Receipt.id)
+        plan = self.session.execute(ExplainJSON(statement.statement)).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def receipt_stats(
+        self,
+        user_id: int,
+        filters: ReceiptFilters,
+        period: Optional[StatsPeriod] = None,
+        by_payment_type: bool = False,
+    ) -> List[ReceiptStats]:
+        """Receipt count, revenue and average ticket, aggregated in the database.
+
+        Read from the daily rollups when the filters allow it, otherwise from
+        the receipt table.
+        """
+        if ReceiptRollupRepository.covers(filters):
+            return self.rollups.stats(user_id, filters, period, by_payment_type)
+
+        group_by = []
+        if period is not None:
+            group_by.append(truncate_period(period, Receipt.created_at).label("period"))
+        if by_payment_type:
+            group_by.append(Receipt.payment_type)
+
+        query = self._filtered_query(user_id, filters).with_entities(
+            *group_by,
+            func.count().label("receipts_count"),
+            func.coalesce(func.sum(Receipt.total), 0).label("revenue"),
+            func.avg(Receipt.total).label("average_ticket"),
+        )
+        if group_by:
+            query = query.group_by(*group_by).order_by(*group_by)
+
+        return [
+            ReceiptStats(
+                period=row.period if period is not None else None,
+                payment_type=row.payment_type if by_payment_type else None,
+                receipts_count=row.receipts_count,
+                revenue=int(row.revenue),
+                average_ticket=(
+                    None if row.average_ticket is None else float(row.average_ticket)
+                ),
+            )
+            for row in query.all()
+        ]
+
+    def top_products(
+        self, user_id: int, filters: ReceiptFilters, limit: int
+    ) -> List[ProductStats]:
+        """Products of the matching receipts with the highest revenue"""
+        revenue = func.sum(ReceiptProduct.price * ReceiptProduct.quantity)
+        query = (
+            self._filtered_query(user_id, filters)
+            .join(ReceiptProduct, ReceiptProduct.receipt_id == Receipt.id)
+            .with_entities(
+                ReceiptProduct.name,
+                func.sum(ReceiptProduct.quantity).label("quantity"),
+                revenue.label("revenue"),
+                func.count(func.distinct(Receipt.id)).label("receipts_count"),
+            )
+            .group_by(ReceiptProduct.name)
+            .order_by(revenue.desc(), ReceiptProduct.name)
+            .limit(limit)
+        )
+        return [
+            ProductStats(
+                name=row.name,
+                quantity=float(row.quantity),
+                revenue=round(row.revenue),
+                receipts_count=row.receipts_count,
+            )
+            for row in query.all()
+        ]
 
     def list_receipts(
         self,
         user_id: int,
+        filters: ReceiptFilters,
         limit: int,
         offset: int,
-        created_after: Optional[datetime.datetime],
-        minimum_total: Optional[float],
-        payment_type: Optional[PaymentType],
-    ) -> Tuple[list[ReceiptEntity], int]:
-        query = self.session.query(Receipt).filter(Receipt.user_id == user_id)
+        pagination: PaginationMode = PaginationMode.OFFSET,
+        after: Optional[ReceiptCursor] = None,
+        sort_field: ReceiptSortField = ReceiptSortField.CREATED_AT,
+        direction: SortDirection = SortDirection.ASC,
+    ) -> ReceiptPage:
+        if after is not None:
+            sort_field, direction = after.sort_field, after.direction
+
+        # `id` breaks ties so the order is total and matches the
+        # (user_id, <sort column>, id) indexes in both directions.
+        sort_column = SORT_COLUMNS[sort_field]
+        sort_key = (sort_column, Receipt.id)
+        if direction == SortDirection.DESC:
+            sort_key = (sort_column.desc(), Receipt.id.desc())
+        query = (
+            self._filtered_query(user_id, filters)
+            .with_entities(*RECEIPT_COLUMNS)
+            .order_by(*sort_key)
+        )
+
+        if pagination == PaginationMode.OFFSET:
+            receipt_rows = query.limit(limit).offset(offset).all()
+            return ReceiptPage(receipts=self._map_receipt_rows(receipt_rows))
+
+        # Keyset pagination: seek past the cursor on the index instead of
+        # scanning and discarding every earlier row.
+        if after is not None:
+            position = tuple_(sort_column, Receipt.id)
+            cursor = tuple_(after.value, after.id)
+            query = query.filter(
+                position < cursor
+                if direction == SortDirection.DESC
+                else position > cursor
+            )
 
-        if created_after:
-            query = query.filter(Receipt.created_at >= created_after)
+        receipt_rows = query.limit(limit + 1).all()
+        has_more = len(receipt_rows) > limit
+        receipt_rows = receipt_rows[:limit]
 
-        if minimum_total:
-            query = query.filter(Receipt.total >= minimum_total)
+        next_cursor = None
+        if has_more:
+            last = receipt_rows[-1]
+            next_cursor = ReceiptCursor(
+                value=getattr(last, sort_field.value),
+                id=last.id,
+                sort_field=sort_field,
+                direction=direction,
+            ).encode()
 
-        if payment_type:
-            query = query.filter(Receipt.payment_type == payment_type)
+        return ReceiptPage(
+            receipts=self._map_receipt_rows(receipt_rows), next_cursor=next_cursor
+        )
+
+    def _map_receipt_rows(self, receipt_rows: List[Row]) -> List[ReceiptPayload]:
+        """Payloads for a page of receipt rows, products come in one query"""
+        if not receipt_rows:
+            return []
 
-        total_count = int(query.with_entities(func.count()).scalar())
+        product_rows = self.session.execute(
+            select(*PRODUCT_COLUMNS)
+            .where(ReceiptProduct.receipt_id.in_([row.id for row in receipt_rows]))
+            .order_by(ReceiptProduct.id)
+        )
+        products_by_receipt = defaultdict(list)
+        for product_row in product_rows:
+            products_by_receipt[product_row.receipt_id].append(product_row)
 
-        receipt_db_models = query.limit(limit).offset(offset).all()
+        return [
+            map_receipt_row_to_payload(row, products_by_receipt[row.id])
+            for row in receipt_rows
+        ]
 
-        receipts = [map_receipt_db_to_entity(r) for r in receipt_db_models]
+    def iter_receipt_batches(
+        self, user_id: int, filters: ReceiptFilters, batch_size: int
+    ) -> Iterator[List[ReceiptEntity]]:
+        """Stream every matching receipt in batches of at most `batch_size`.
 
-        return receipts, total_count
+        Rows come from a server-side cursor (`yield_per`) and products are
+        loaded per batch, so memory stays flat however many receipts match.
+        """
+        query = (
+            self._filtered_query(user_id, filters)
+            .options(selectinload(Receipt.products))
+            .order_by(Receipt.created_at, Receipt.id)
+        )
+        result = self.session.scalars(
+            query.statement, execution_options={"yield_per": batch_size}
+        )
+        try:
+            for receipt_db_models in result.partitions():
+                yield [map_receipt_db_to_entity(r) for r in receipt_db_models]
+        finally:
+            result.close()
 
-    def get_receipt_by_public_id(self, public_id: str) -> ReceiptEntity | None:
+    def get_receipt_by_public_id(
+        self, public_id: UUID, loading: ProductsLoading = ProductsLoading.JOINED
+    ) -> ReceiptEntity | None:
+        return self._read_your_writes(
+            self._get_receipt_by_public_id, public_id, loading
+        )
+
+    def get_receipt_id_by_public_id(self, public_id: UUID, user_id: int) -> int | None:
+        return self._read_your_writes(
+            self._get_receipt_id_by_public_id, public_id, user_id
+        )
+
+    def _get_receipt_id_by_public_id(self, public_id: UUID, user_id: int) -> int | None:
+        return self.session.execute(
+            select(Receipt.id).where(
+                Receipt.public_id == public_id, Receipt.user_id == user_id
+            )
+        ).scalar()
+
+    def _get_receipt_by_public_id(
+        self, public_id: UUID, loading: ProductsLoading
+    ) -> ReceiptEntity | None:
         receipt_model_obj: Receipt | None = (
-            self.session.query(Receipt).filter(Receipt.public_id == public_id).first()
+            self._query_receipts(loading).filter(Receipt.public_id == public_id).first()
         )
         if not receipt_model_obj:
             return
 
         return map_receipt_db_to_entity(receipt_model_obj)
+
+
+class AsyncReceiptRepository:
+    """Non-blocking facade over `ReceiptRepository` for async request handlers"""
+
+    def __init__(self, runner: SessionRunner):
+        self.__runner = runner
+        self.__repository = ReceiptRepository(runner.session)
+
+    async def save_receipt(
+        self, receipt_entity: ReceiptEntity, commit: bool = True
+    ) -> ReceiptEntity:
+        return await self.__runner.run(
+            self.__repository.save_receipt, receipt_entity, commit
+        )
+
+    async def save_receipts(
+        self, receipt_entities: List[ReceiptEntity], commit: bool = True
+    ) -> List[ReceiptEntity]:
+        return await self.__runner.run(
+            self.__repository.save_receipts, receipt_entities, commit
+        )
+
+    async def get_receipt_by_id(
+        self, receipt_id: int, user_id: int
+    ) -> ReceiptPayload | None:
+        return await self.__runner.run(
+            self.__repository.get_receipt_by_id, receipt_id, user_id
+        )
+
+    async def count_receipts(self, user_id: int, filters: ReceiptFilters) -> int:
+        return await self.__runner.run(
+            self.__repository.count_receipts, user_id, filters
+        )
+
+    async def estimate_receipts_count(
+        self, user_id: int, filters: ReceiptFilters
+    ) -> int | None:
+        return await self.__runner.run(
+            self.__repository.estimate_receipts_count, user_id, filters
+        )
+
+    async def receipt_stats(
+        self,
+        user_id: int,
+        filters: ReceiptFilters,
+        period: Optional[StatsPeriod] = None,
+        by_payment_type: bool = False,
+    ) -> List[ReceiptStats]:
+        return await self.__runner.run(
+            self.__repository.receipt_stats,
+            user_id=user_id,
+            filters=filters,
+            period=period,
+            by_payment_type=by_payment_type,
+        )
+
+    async def top_products(
+        self, user_id: int, filters: ReceiptFilters, limit: int
+    ) -> List[ProductStats]:
+        return await self.__runner.run(
+            self.__repository.top_products, user_id, filters, limit
+        )
+
+    async def list_receipts(
+        self,
+        user_id: int,
+        filters: ReceiptFilters,
+        limit: int,
+        offset: int,
+        pagination: PaginationMode = PaginationMode.OFFSET,
+        after: Optional[ReceiptCursor] = None,
+        sort_field: ReceiptSortField = ReceiptSortField.CREATED_AT,
+        direction: SortDirection = SortDirection.ASC,
+    ) -> ReceiptPage:
+        return await self.__runner.run(
+            self.__repository.list_receipts,
+            user_id=user_id,
+            filters=filters,
+            limit=limit,
+            offset=offset,
+            pagination=pagination,
+            after=after,
+            sort_field=sort_field,
+            direction=direction,
+        )
+
+    async def iter_receipt_batches(
+        self, user_id: int, filters: ReceiptFilters, batch_size: int
+    ) -> AsyncIterator[List[ReceiptEntity]]:
+        batches = self.__repository.iter_receipt_batches(user_id, filters, batch_size)
+        async for batch in self.__runner.iterate(batches):
+            yield batch
+
+    async def get_receipt_by_public_id(self, public_id: UUID) -> ReceiptEntity | None:
+        return await self.__runner.run(
+            self.__repository.get_receipt_by_public_id, public_id
+        )
+
+    async def get_receipt_id_by_public_id(
+        self, public_id: UUID, user_id: int
+    ) -> int | None:
+        return await self.__runner.run(
+            self.__repository.get_receipt_id_by_public_id, public_id, user_id
+        )
@@ -0,0 +1,200 @@
+import datetime
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.core.constants import PaymentType, StatsPeriod
+from src.db.functions import truncate_period
+from src.db.models.receipt import Receipt, ReceiptDailyRollup
+from src.domain.models import ReceiptEntity, ReceiptFilters, ReceiptStats
+
+RollupKey = Tuple[int, datetime.date, PaymentType]
+
+
+def utc_day(created_at: datetime.datetime) -> datetime.date:
+    # Naive timestamps come from SQLite, which stores them in UTC.
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(datetime.timezone.utc)
+    return created_at.date()
+
+
+def is_utc_midnight(moment: datetime.datetime) -> bool:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc)
+    return moment.time() == datetime.time()
+
+
+class ReceiptRollupRepository:
+    """Maintains and reads `receipt_daily_rollup`.
+
+    Rows are keyed by user, UTC day and payment type. Writes are upserts that
+    add to the existing counters and are meant to run in the transaction that
+    inserts the receipts.
+    """
+
+    def __init__(self, db_session: Session):
+        self.session = db_session
+
+    @staticmethod
+    def covers(filters: ReceiptFilters) -> bool:
+        """Whether stats for `filters` can be answered from whole-day rollups"""
+        if (
+            filters.minimum_total is not None
+            or filters.maximum_total is not None
+            or filters.product_name
+        ):
+            return False
+        return all(
+            boundary is None or is_utc_midnight(boundary)
+            for boundary in (filters.created_after, filters.created_before)
+        )
+
+    def add_receipts(self, receipt_entities: List[ReceiptEntity]) -> None:
+        counters: Dict[RollupKey, List[int]] = defaultdict(lambda: [0, 0, 0])
+        for entity in receipt_entities:
+            key = (entity.user_id, utc_day(entity.created_at), entity.payment.type)
+            counter = counters[key]
+            counter[0] += 1
+            counter[1] += entity.total
+            counter[2] += entity.payment.amount
+
+        if not counters:
+            return
+
+        statement = self._insert()
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                ReceiptDailyRollup.user_id,
+                ReceiptDailyRollup.day,
+                ReceiptDailyRollup.payment_type,
+            ],
+            set_={
+                "receipts_count": ReceiptDailyRollup.receipts_count
+                + statement.excluded.receipts_count,
+                "total_sum": ReceiptDailyRollup.total_sum
+                + statement.excluded.total_sum,
+                "payment_amount_sum": ReceiptDailyRollup.payment_amount_sum
+                + statement.excluded.payment_amount_sum,
+            },
+        )
+        self.session.execute(
+            statement,
+            [
+                {
+                    "user_id": user_id,
+                    "day": day,
+                    "payment_type": payment_type,
+                    "receipts_count": receipts_count,
+                    "total_sum": total_sum,
+                    "payment_amount_sum": payment_amount_sum,
+                }
+                for (user_id, day, payment_type), (
+                    receipts_count,
+                    total_sum,
+                    payment_amount_sum,
+                ) in counters.items()
+            ],
+        )
+
+    def stats(
+        self,
+        user_id: int,
+        filters: ReceiptFilters,
+        period: Optional[StatsPeriod] = None,
+        by_payment_type: bool = False,
+    ) -> List[ReceiptStats]:
+        group_by = []
+        if period is not None:
+            group_by.append(
+                truncate_period(period, ReceiptDailyRollup.day).label("period")
+            )
+        if by_payment_type:
+            group_by.append(ReceiptDailyRollup.payment_type)
+
+        statement = select(
+            *group_by,
+            func.coalesce(func.sum(ReceiptDailyRollup.receipts_count), 0).label(
+                "receipts_count"
+            ),
+            func.coalesce(func.sum(ReceiptDailyRollup.total_sum), 0).label("revenue"),
+        ).where(ReceiptDailyRollup.user_id == user_id)
+
+        if filters.created_after is not None:
+            statement = statement.where(
+                ReceiptDailyRollup.day >= utc_day(filters.created_after)
+            )
+        if filters.created_before is not None:
+            statement = statement.where(
+                ReceiptDailyRollup.day < utc_day(filters.created_before)
+            )
+        if filters.payment_type:
+            statement = statement.where(
+                ReceiptDailyRollup.payment_type == filters.payment_type
+            )
+        if group_by:
+            statement = statement.group_by(*group_by).order_by(*group_by)
+
+        return [
+            ReceiptStats(
+                period=row.period if period is not None else None,
+                payment_type=row.payment_type if by_payment_type else None,
+                receipts_count=int(row.receipts_count),
+                revenue=int(row.revenue),
+                average_ticket=(
+                    int(row.revenue) / row.receipts_count
+                    if row.receipts_count
+                    else None
+                ),
+            )
+            for row in self.session.execute(statement)
+        ]
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """Recompute rollups from the receipt table, for all users or one.
+
+        On PostgreSQL receipt inserts are blocked while the rebuild runs, so
+        no concurrent upsert is lost or counted twice.
+        """
+        if self.session.get_bind().dialect.name == "postgresql":
+            self.session.execute(text("LOCK TABLE receipt IN SHARE MODE"))
+
+        delete_statement = delete(ReceiptDailyRollup)
+        day = truncate_period(StatsPeriod.DAY, Receipt.created_at)
+        source = select(
+            Receipt.user_id,
+            day,
+            Receipt.payment_type,
+            func.count(),
+            func.sum(Receipt.total),
+            func.sum(Receipt.payment_amount),
+        ).group_by(Receipt.user_id, day, Receipt.payment_type)
+        if user_id is not None:
+            delete_statement = delete_statement.where(
+                ReceiptDailyRollup.user_id == user_id
+            )
+            source = source.where(Receipt.user_id == user_id)
+
+        self.session.execute(delete_statement)
+        result = self.session.execute(
+            insert(ReceiptDailyRollup).from_select(
+                [
+                    ReceiptDailyRollup.user_id,
+                    ReceiptDailyRollup.day,
+                    ReceiptDailyRollup.payment_type,
+                    ReceiptDailyRollup.receipts_count,
+                    ReceiptDailyRollup.total_sum,
+                    ReceiptDailyRollup.payment_amount_sum,
+                ],
+                source,
+            )
+        )
+        self.session.commit()
+        return result.rowcount
+
+    def _insert(self):
+        if self.session.get_bind().dialect.name == "postgresql":
+            return postgresql.insert(ReceiptDailyRollup)
+        return sqlite.insert(ReceiptDailyRollup)
@@ -0,0 +1,133 @@
+import datetime
+from uuid import UUID
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from src.db.models.refresh_token import RefreshToken
+from src.db.runner import SessionRunner
+
+
+class RefreshTokenRepository:
+    """Issued refresh tokens.
+
+    Rows are only reached by primary key or family index, so rotating a token
+    costs the same however many tokens have been issued.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self.__session = session
+
+    def add(
+        self,
+        token_id: UUID,
+        family_id: UUID,
+        user_id: int,
+        expires_at: datetime.datetime,
+    ) -> None:
+        self.__session.execute(
+            insert(RefreshToken).values(
+                id=token_id,
+                family_id=family_id,
+                user_id=user_id,
+                expires_at=expires_at,
+            )
+        )
+        self.__session.commit()
+
+    def rotate(
+        self,
+        token_id: UUID,
+        new_token_id: UUID,
+        family_id: UUID,
+        user_id: int,
+        expires_at: datetime.datetime,
+    ) -> bool:
+        """Use up a token and record its successor in one transaction.
+
+        Returns `False`, recording nothing, when the token is unknown, already
+        used or revoked. The conditional update lets only one of concurrent
+        rotations of the same token succeed.
+        """
+        result = self.__session.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == token_id,
+                RefreshToken.family_id == family_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=datetime.datetime.now(datetime.UTC))
+        )
+        if result.rowcount != 1:
+            self.__session.rollback()
+            return False
+
+        self.__session.execute(
+            insert(RefreshToken).values(
+                id=new_token_id,
+                family_id=family_id,
+                user_id=user_id,
+                expires_at=expires_at,
+            )
+        )
+        self.__session.commit()
+        return True
+
+    def revoke_family(self, family_id: UUID) -> None:
+        self.__session.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.family_id == family_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=datetime.datetime.now(datetime.UTC))
+        )
+        self.__session.commit()
+
+    def purge_expired(self) -> int:
+        result = self.__session.execute(
+            delete(RefreshToken).where(
+                RefreshToken.expires_at < datetime.datetime.now(datetime.UTC)
+            )
+        )
+        self.__session.commit()
+        return result.rowcount
+
+
+class AsyncRefreshTokenRepository:
+    """Non-blocking facade over `RefreshTokenRepository` for async request handlers"""
+
+    def __init__(self, runner: SessionRunner) -> None:
+        self.__runner = runner
+        self.__repository = RefreshTokenRepository(runner.session)
+
+    async def add(
+        self,
+        token_id: UUID,
+        family_id: UUID,
+        user_id: int,
+        expires_at: datetime.datetime,
+    ) -> None:
+        await self.__runner.run(
+            self.__repository.add, token_id, family_id, user_id, expires_at
+        )
+
+    async def rotate(
+        self,
+        token_id: UUID,
+        new_token_id: UUID,
+        family_id: UUID,
+        user_id: int,
+        expires_at: datetime.datetime,
+    ) -> bool:
+        return await self.__runner.run(
+            self.__repository.rotate,
+            token_id,
+            new_token_id,
+            family_id,
+            user_id,
+            expires_at,
+        )
+
+    async def revoke_family(self, family_id: UUID) -> None:
+        await self.__runner.run(self.__repository.revoke_family, family_id)
@@ -2,6 +2,8 @@ from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from src.db.models.user import User
+from src.db.routing import primary_reads, reads_from_replica
+from src.db.runner import SessionRunner
 
 
 class UserRepository:
@@ -21,4 +23,42 @@ class UserRepository:
         return new_user
 
     def get_user_by_username(self, username: str) -> User | None:
+        user = self.__query_user_by_username(username)
+        if user is None and reads_from_replica(self.__session):
+            # The user may have just signed up and not be replicated yet.
+            with primary_reads(self.__session):
+                user = self.__query_user_by_username(username)
+        return user
+
+    def __query_user_by_username(self, username: str) -> User | None:
         return self.__session.query(User).filter(User.username == username).first()
+
+    def update_password_hash(self, user_id: int, password_hash: str) -> None:
+        self.__session.query(User).filter(User.id == user_id).update(
+            {User.password_hash: password_hash}, synchronize_session=False
+        )
+        self.__session.commit()
+
+
+class AsyncUserRepository:
+    """Non-blocking facade over `UserRepository` for async request handlers"""
+
+    def __init__(self, runner: SessionRunner) -> None:
+        self.__runner = runner
+        self.__repository = UserRepository(runner.session)
+
+    async def create_user(self, name: str, username: str, password_hash: str) -> User:
+        return await self.__runner.run(
+            self.__repository.create_user,
+            name=name,
+            username=username,
+            password_hash=password_hash,
+        )
+
+    async def get_user_by_username(self, username: str) -> User | None:
+        return await self.__runner.run(self.__repository.get_user_by_username, username)
+
+    async def update_password_hash(self, user_id: int, password_hash: str) -> None:
+        await self.__runner.run(
+            self.__repository.update_password_hash, user_id, password_hash
+        )
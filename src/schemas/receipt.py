@@ -1,18 +1,26 @@
 import datetime
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, confloat, conint, conlist
+from pydantic import BaseModel, confloat, conint, conlist, field_validator
+
+from src.core.constants import (
+    RECEIPT_BATCH_MAX_SIZE,
+    RECEIPT_PRODUCT_MAX_QUANTITY,
+    PaymentType,
+    ReceiptIngestionStatus,
+)
+from src.core.money import MAX_AMOUNT
 
 
 class ProductCreateSchema(BaseModel):
     name: str
-    price: confloat(ge=0)
-    quantity: conint(gt=0)
+    price: confloat(ge=0, le=MAX_AMOUNT)
+    quantity: conint(gt=0, le=RECEIPT_PRODUCT_MAX_QUANTITY)
 
 
 class PaymentSchema(BaseModel):
-    amount: confloat(gt=0)
+    amount: confloat(gt=0, le=MAX_AMOUNT)
     type: str
 
 
@@ -20,17 +28,80 @@ class ReceiptCreateSchema(BaseModel):
     products: List[ProductCreateSchema]
     payment: PaymentSchema
 
+    @field_validator("products")
+    def total_within_limit(cls, products: List[ProductCreateSchema]):
+        if sum(product.price * product.quantity for product in products) > MAX_AMOUNT:
+            raise ValueError(f"Receipt total must not exceed {MAX_AMOUNT}")
+        return products
+
+
+ReceiptBatchCreateSchema = conlist(
+    ReceiptCreateSchema, min_length=1, max_length=RECEIPT_BATCH_MAX_SIZE
+)
+
+
+class ProductResponseSchema(BaseModel):
+    name: str
+    price: float
+    quantity: float
+    total: float
+
+
+class PaymentResponseSchema(BaseModel):
+    type: PaymentType
+    amount: float
+
 
 class ReceiptResponseSchema(BaseModel):
     id: int
     public_id: UUID
     total: float
     rest: float
-    payment: dict
-    products: List[dict]
+    payment: PaymentResponseSchema
+    products: List[ProductResponseSchema]
     created_at: datetime.datetime
 
 
+class ReceiptStatusResponseSchema(BaseModel):
+    public_id: UUID
+    status: ReceiptIngestionStatus
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
 class PaginatedReceiptResponseSchema(BaseModel):
     receipts: List[ReceiptResponseSchema]
-    total_count: int
+    total_count: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class ReceiptStatsGroupSchema(BaseModel):
+    period: Optional[datetime.date] = None
+    payment_type: Optional[PaymentType] = None
+    receipts_count: int
+    revenue: float
+    average_ticket: Optional[float] = None
+
+
+class ReceiptStatsResponseSchema(BaseModel):
+    groups: List[ReceiptStatsGroupSchema]
+
+
+class ProductStatsSchema(BaseModel):
+    name: str
+    quantity: float
+    revenue: float
+    receipts_count: int
+
+
+class TopProductsResponseSchema(BaseModel):
+    products: List[ProductStatsSchema]
+
+
+class ReceiptBatchItemResponseSchema(BaseModel):
+    id: int
+    public_id: UUID
+
+
+class ReceiptBatchCreateResponseSchema(BaseModel):
+    receipts: List[ReceiptBatchItemResponseSchema]
@@ -1,17 +1,28 @@
-from typing import Dict
+import uuid
+from typing import Any, Dict
+from uuid import UUID
 
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from src.core.password_hashing import PasswordHasher, password_hasher
 from src.core.security import (
     decode_jwt_token,
-    generate_access_token,
     generate_auth_tokens,
-    hash_password,
-    verify_password,
+    refresh_token_expires_at,
 )
 from src.db.models.user import User
-from src.repositories.user_repository import UserRepository
+from src.db.runner import SessionRunner
+from src.domain.mappers import map_user_db_to_entity
+from src.domain.models import UserEntity
+from src.repositories.refresh_token_repository import AsyncRefreshTokenRepository
+from src.repositories.user_repository import AsyncUserRepository
+from src.services.refresh_token_revocations import (
+    RevokedRefreshTokens,
+    revoked_refresh_tokens,
+)
+from src.services.user_cache import UserCache, user_cache
 
 
 class AuthServiceException(Exception):
@@ -27,40 +38,160 @@ class DuplicateUserException(AuthServiceException):
 
 class AuthService:
     @classmethod
-    def create(cls, db_session: Session) -> "AuthService":
-        return cls(UserRepository(db_session))
-
-    def __init__(self, user_repository: UserRepository) -> None:
+    def create(cls, db_session: Session | AsyncSession) -> "AuthService":
+        runner = SessionRunner.for_session(db_session)
+        return cls(
+            AsyncUserRepository(runner),
+            AsyncRefreshTokenRepository(runner),
+            user_cache,
+            password_hasher,
+            revoked_refresh_tokens,
+        )
+
+    def __init__(
+        self,
+        user_repository: AsyncUserRepository,
+        refresh_token_repository: AsyncRefreshTokenRepository,
+        user_cache: UserCache,
+        password_hasher: PasswordHasher,
+        revoked_tokens: RevokedRefreshTokens,
+    ) -> None:
         self.__user_repository = user_repository
+        self.__refresh_token_repository = refresh_token_repository
+        self.__user_cache = user_cache
+        self.__password_hasher = password_hasher
+        self.__revoked_tokens = revoked_tokens
 
-    def register(self, name: str, username: str, password: str) -> User:
-        password_hash = hash_password(password)
+    async def register(self, name: str, username: str, password: str) -> User:
+        password_hash = await self.__password_hasher.hash(password)
         try:
-            return self.__user_repository.create_user(
+            user = await self.__user_repository.create_user(
                 name=name, username=username, password_hash=password_hash
             )
         except IntegrityError:
             raise DuplicateUserException(username)
 
-    def login(self, username: str, password: str) -> Dict[str, str] | None:
-        user = self.__user_repository.get_user_by_username(username=username)
-        if not user or not verify_password(password, user.password_hash):
+        self.invalidate_user(username)
+        return user
+
+    async def login(self, username: str, password: str) -> Dict[str, str] | None:
+        user = await self.__user_repository.get_user_by_username(username=username)
+        if not user:
+            return
+
+        is_valid, new_password_hash = await self.__password_hasher.verify_and_update(
+            password, user.password_hash
+        )
+        if not is_valid:
             return
 
-        return generate_auth_tokens(user.username)
+        # Commits expire `user`, and an AsyncSession cannot lazily reload it.
+        user_id, username = user.id, user.username
 
-    def verify_access_token(self, token: str) -> User | None:
+        if new_password_hash:
+            await self.__user_repository.update_password_hash(
+                user_id, new_password_hash
+            )
+
+        token_id, family_id = uuid.uuid4(), uuid.uuid4()
+        await self.__refresh_token_repository.add(
+            token_id, family_id, user_id, refresh_token_expires_at()
+        )
+        return generate_auth_tokens(username, user_id, token_id, family_id)
+
+    async def verify_access_token(self, token: str) -> UserEntity | None:
+        payload = self.decode_access_token(token)
+        if not payload:
+            return None
+
+        return await self.get_user(username=payload["sub"])
+
+    def get_user_id_from_access_token(self, token: str) -> int | None:
+        """User id carried in the token claims, without touching the database"""
+        payload = self.decode_access_token(token)
+        if not payload or not isinstance(payload.get("uid"), int):
+            return None
+
+        return payload["uid"]
+
+    @staticmethod
+    def decode_access_token(token: str) -> Dict[str, Any] | None:
         payload = decode_jwt_token(token)
 
         if not payload or not payload.get("sub") or payload.get("type") != "access":
             return None
 
-        return self.__user_repository.get_user_by_username(username=payload["sub"])
+        return payload
 
-    def refresh_access_token(self, refresh_token: str) -> str | None:
-        payload = decode_jwt_token(refresh_token)
+    async def get_user(self, username: str) -> UserEntity | None:
+        cached_user = self.__user_cache.get(username)
+        if cached_user:
+            return cached_user
 
-        if not payload or "sub" not in payload or payload.get("type") != "refresh":
-            return
+        user = await self.__user_repository.get_user_by_username(username=username)
+        if not user:
+            return None
+
+        user_entity = map_user_db_to_entity(user)
+        self.__user_cache.set(user_entity)
+        return user_entity
+
+    def invalidate_user(self, username: str) -> None:
+        self.__user_cache.invalidate(username)
+
+    async def rotate_refresh_token(self, refresh_token: str) -> Dict[str, str] | None:
+        """New access and refresh tokens in exchange for a refresh token.
+
+        Each refresh token can be used once. A used token presented again has
+        leaked, so the whole family descending from that login is revoked and
+        its current token stops working too.
+        """
+        payload = self.decode_refresh_token(refresh_token)
+        if not payload:
+            return None
+
+        token_id, family_id = payload["jti"], payload["fam"]
+        if self.__revoked_tokens.is_family_revoked(family_id):
+            return None
+
+        new_token_id = uuid.uuid4()
+        rotated = not self.__revoked_tokens.is_token_revoked(
+            token_id
+        ) and await self.__refresh_token_repository.rotate(
+            token_id,
+            new_token_id,
+            family_id,
+            payload["uid"],
+            refresh_token_expires_at(),
+        )
+        if not rotated:
+            await self.__refresh_token_repository.revoke_family(family_id)
+            self.__revoked_tokens.revoke_family(family_id)
+            return None
+
+        self.__revoked_tokens.revoke_token(token_id, payload["exp"])
+        return generate_auth_tokens(
+            payload["sub"], payload["uid"], new_token_id, family_id
+        )
+
+    @staticmethod
+    def decode_refresh_token(token: str) -> Dict[str, Any] | None:
+        """Claims of a refresh token, with `jti` and `fam` parsed to UUIDs"""
+        payload = decode_jwt_token(token)
+
+        # Tokens issued before rotation have no `jti` and are not accepted.
+        if (
+            not payload
+            or not payload.get("sub")
+            or payload.get("type") != "refresh"
+            or not isinstance(payload.get("uid"), int)
+        ):
+            return None
+
+        try:
+            token_id, family_id = UUID(payload["jti"]), UUID(payload["fam"])
+        except (KeyError, TypeError, ValueError):
+            return None
 
-        return generate_access_token(username=payload["sub"])
+        # The verified payload is shared with the token cache, copy it.
+        return {**payload, "jti": token_id, "fam": family_id}
@@ -0,0 +1,116 @@
+import datetime
+import hashlib
+from typing import Any, Awaitable, Callable, Dict
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.responses import Response
+
+from src.core import settings
+from src.db.runner import SessionRunner
+from src.repositories.idempotency_key_repository import (
+    AsyncIdempotencyKeyRepository,
+)
+
+# Set on responses replayed from a stored idempotency key.
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyServiceException(Exception):
+    pass
+
+
+class IdempotencyKeyInProgressException(IdempotencyServiceException):
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.message = f"A request with Idempotency-Key `{key}` is in progress"
+        super().__init__(self.message)
+
+
+class IdempotencyKeyReusedException(IdempotencyServiceException):
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.message = f"Idempotency-Key `{key}` was used for a different request"
+        super().__init__(self.message)
+
+
+def request_hash(path: str, body: Any) -> str:
+    return hashlib.sha256(
+        path.encode() + b"\n" + orjson.dumps(body, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+
+
+def expires_in(seconds: int) -> datetime.datetime:
+    return datetime.datetime.now(datetime.UTC) + datetime.timedelta(seconds=seconds)
+
+
+def stored_headers(response: Response) -> Dict[str, str]:
+    # Replays compute their own length.
+    return {
+        name: value
+        for name, value in response.headers.items()
+        if name != "content-length"
+    }
+
+
+class IdempotencyService:
+    """Runs a request once per `(user_id, key)` and replays its response.
+
+    The key is claimed before the request runs, for IDEMPOTENCY_KEY_LOCK_SECONDS,
+    and holds the successful response for IDEMPOTENCY_KEY_TTL_SECONDS after.
+    The handler must leave its writes uncommitted, they are committed together
+    with the stored response, so a crash in between stores neither. A failed
+    request rolls them back and releases the key so that it can be retried.
+    """
+
+    @classmethod
+    def create(cls, db_session: Session | AsyncSession) -> "IdempotencyService":
+        return cls(AsyncIdempotencyKeyRepository(SessionRunner.for_session(db_session)))
+
+    def __init__(self, idempotency_key_repository: AsyncIdempotencyKeyRepository):
+        self.__repository = idempotency_key_repository
+
+    async def run(
+        self,
+        user_id: int,
+        key: str,
+        request_hash: str,
+        handler: Callable[[], Awaitable[Response]],
+    ) -> Response:
+        holder = await self.__repository.reserve(
+            user_id,
+            key,
+            request_hash,
+            expires_in(settings.IDEMPOTENCY_KEY_LOCK_SECONDS),
+        )
+        if holder is not None:
+            if holder.request_hash != request_hash:
+                raise IdempotencyKeyReusedException(key)
+            if holder.status_code is None:
+                raise IdempotencyKeyInProgressException(key)
+            return Response(
+                holder.response_body,
+                status_code=holder.status_code,
+                headers={**holder.response_headers, REPLAYED_HEADER: "true"},
+            )
+
+        try:
+            response = await handler()
+        except BaseException:
+            await self.__repository.release(user_id, key)
+            raise
+
+        if not 200 <= response.status_code < 300:
+            await self.__repository.release(user_id, key)
+            return response
+
+        await self.__repository.complete(
+            user_id,
+            key,
+            response.status_code,
+            response.body,
+            stored_headers(response),
+            expires_in(settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+        )
+        return response
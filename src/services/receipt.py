@@ -1,55 +1,266 @@
+import dataclasses
 import datetime
-from typing import Dict, Optional, Tuple
+import uuid
+from typing import Dict, List, Optional
+from uuid import UUID
 
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from src.core.constants import PaymentType
-from src.domain.models import PaymentEntity, ProductEntity, ReceiptEntity
-from src.repositories.receipt_repository import ReceiptRepository
+from src.core.constants import (
+    CountMode,
+    PaginationMode,
+    PaymentType,
+    ReceiptIngestionStatus,
+    ReceiptSortField,
+    SortDirection,
+    StatsPeriod,
+)
+from src.core.money import to_minor_units
+from src.db.routing import RecentWrites, recent_writes
+from src.db.runner import SessionRunner
+from src.domain.models import (
+    PaymentEntity,
+    ProductEntity,
+    ProductStats,
+    ReceiptEntity,
+    ReceiptFilters,
+    ReceiptPage,
+    ReceiptPayload,
+    ReceiptStats,
+    ReceiptStatus,
+)
+from src.repositories.pagination import ReceiptCursor
+from src.repositories.receipt_repository import AsyncReceiptRepository
+from src.services.receipt_counts import ReceiptCountCache, receipt_count_cache
+from src.services.receipt_formatting import generate_receipt_text
+from src.services.receipt_queue import ReceiptQueue, receipt_queue
+from src.services.receipt_text_cache import (
+    RenderedReceipt,
+    RenderedReceiptCache,
+    rendered_receipt_cache,
+)
+
+
+class ReceiptServiceException(Exception):
+    pass
+
+
+class UnknownPaymentTypeException(ReceiptServiceException):
+    def __init__(self, payment_type: str) -> None:
+        self.payment_type = payment_type
+        self.message = f"Unknown payment type `{payment_type}`"
+        super().__init__(self.message)
 
 
 class ReceiptService:
     @classmethod
-    def create(cls, db_session: Session) -> "ReceiptService":
-        return cls(ReceiptRepository(db_session))
+    def create(cls, db_session: Session | AsyncSession) -> "ReceiptService":
+        return cls(
+            AsyncReceiptRepository(SessionRunner.for_session(db_session)),
+            receipt_count_cache,
+            rendered_receipt_cache,
+            recent_writes,
+            receipt_queue,
+        )
 
-    def __init__(self, receipt_repository: ReceiptRepository):
+    def __init__(
+        self,
+        receipt_repository: AsyncReceiptRepository,
+        count_cache: ReceiptCountCache,
+        text_cache: RenderedReceiptCache,
+        writes: RecentWrites,
+        queue: ReceiptQueue,
+    ):
         self.__receipt_repository = receipt_repository
+        self.__count_cache = count_cache
+        self.__text_cache = text_cache
+        self.__writes = writes
+        self.__queue = queue
 
-    def create_receipt(self, receipt_data: Dict, user_id: int) -> ReceiptEntity:
-        products = [
-            ProductEntity(**product_data) for product_data in receipt_data["products"]
-        ]
-        payment = PaymentEntity(**receipt_data["payment"])
+    @staticmethod
+    def build_receipt(receipt_data: Dict, user_id: int) -> ReceiptEntity:
+        products = tuple(
+            ProductEntity(
+                name=product_data["name"],
+                price=to_minor_units(product_data["price"]),
+                quantity=product_data["quantity"],
+            )
+            for product_data in receipt_data["products"]
+        )
+        payment = PaymentEntity(
+            amount=to_minor_units(receipt_data["payment"]["amount"]),
+            type=receipt_data["payment"]["type"],
+        )
 
         receipt = ReceiptEntity(user_id=user_id, products=products, payment=payment)
 
-        receipt.calculate_total()
+        return receipt.with_totals()
 
-        saved_receipt = self.__receipt_repository.save_receipt(receipt)
+    async def create_receipt(
+        self, receipt_data: Dict, user_id: int, commit: bool = True
+    ) -> ReceiptEntity:
+        receipt = self.build_receipt(receipt_data, user_id)
+
+        saved_receipt = await self.__receipt_repository.save_receipt(receipt, commit)
+        self.__count_cache.invalidate_user(user_id)
+        self.__writes.mark(user_id)
 
         return saved_receipt
 
-    def get_receipt_by_id(self, receipt_id: int, user_id: int) -> ReceiptEntity:
-        return self.__receipt_repository.get_receipt_by_id(receipt_id, user_id)
+    async def create_receipts(
+        self, receipts_data: List[Dict], user_id: int, commit: bool = True
+    ) -> List[ReceiptEntity]:
+        """Store receipts, `commit=False` leaves them to the caller's commit"""
+        receipts = [
+            self.build_receipt(receipt_data, user_id) for receipt_data in receipts_data
+        ]
+
+        saved_receipts = await self.__receipt_repository.save_receipts(receipts, commit)
+        self.__count_cache.invalidate_user(user_id)
+        self.__writes.mark(user_id)
+
+        return saved_receipts
+
+    async def accept_receipts(
+        self, receipts_data: List[Dict], user_id: int
+    ) -> List[ReceiptEntity]:
+        """Validate receipts and queue them to be stored in the background.
+
+        The receipts get their `public_id` and `created_at` right away, `id` is
+        only known once they are stored, see `get_receipt_status`.
+        """
+        accepted_at = datetime.datetime.now(datetime.UTC)
+        receipts = []
+        for receipt_data in receipts_data:
+            receipt = self.build_receipt(receipt_data, user_id)
+            # Anything the database would reject has to be caught up front,
+            # the client is told the receipt was accepted.
+            try:
+                payment_type = PaymentType(receipt.payment.type)
+            except ValueError:
+                raise UnknownPaymentTypeException(receipt.payment.type)
+            receipts.append(
+                dataclasses.replace(
+                    receipt,
+                    payment=dataclasses.replace(receipt.payment, type=payment_type),
+                    public_id=uuid.uuid4(),
+                    created_at=accepted_at,
+                )
+            )
+
+        await run_in_threadpool(self.__queue.put, receipts)
+        return receipts
+
+    async def get_receipt_status(
+        self, public_id: UUID, user_id: int
+    ) -> ReceiptStatus | None:
+        # The queue is checked first, the worker removes receipts from it only
+        # after they are stored.
+        queued = await run_in_threadpool(self.__queue.get, public_id)
+        if queued is not None:
+            if queued.receipt.user_id != user_id:
+                return None
+            if queued.error is not None:
+                return ReceiptStatus(
+                    public_id, ReceiptIngestionStatus.FAILED, error=queued.error
+                )
+            return ReceiptStatus(public_id, ReceiptIngestionStatus.QUEUED)
 
-    def list_receipts(
+        receipt_id = await self.__receipt_repository.get_receipt_id_by_public_id(
+            public_id, user_id
+        )
+        if receipt_id is None:
+            return None
+        return ReceiptStatus(public_id, ReceiptIngestionStatus.STORED, id=receipt_id)
+
+    async def get_receipt_by_id(
+        self, receipt_id: int, user_id: int
+    ) -> ReceiptPayload | None:
+        return await self.__receipt_repository.get_receipt_by_id(receipt_id, user_id)
+
+    async def list_receipts(
         self,
         user_id: int,
+        filters: ReceiptFilters,
         limit: int,
         offset: int,
-        created_after: Optional[datetime.datetime],
-        minimum_total: Optional[float],
-        payment_type: Optional[PaymentType],
-    ) -> Tuple[list[ReceiptEntity], int]:
-        return self.__receipt_repository.list_receipts(
+        pagination: PaginationMode = PaginationMode.OFFSET,
+        cursor: Optional[str] = None,
+        count_mode: CountMode = CountMode.EXACT,
+        sort_field: ReceiptSortField = ReceiptSortField.CREATED_AT,
+        direction: SortDirection = SortDirection.ASC,
+    ) -> ReceiptPage:
+        page = await self.__receipt_repository.list_receipts(
             user_id=user_id,
+            filters=filters,
             limit=limit,
             offset=offset,
-            created_after=created_after,
-            minimum_total=minimum_total,
-            payment_type=payment_type,
+            pagination=pagination,
+            after=ReceiptCursor.decode(cursor) if cursor else None,
+            sort_field=sort_field,
+            direction=direction,
         )
+        page.total_count = await self.count_receipts(user_id, filters, count_mode)
+        return page
+
+    async def receipt_stats(
+        self,
+        user_id: int,
+        filters: ReceiptFilters,
+        period: Optional[StatsPeriod] = None,
+        by_payment_type: bool = False,
+    ) -> List[ReceiptStats]:
+        return await self.__receipt_repository.receipt_stats(
+            user_id=user_id,
+            filters=filters,
+            period=period,
+            by_payment_type=by_payment_type,
+        )
+
+    async def top_products(
+        self, user_id: int, filters: ReceiptFilters, limit: int
+    ) -> List[ProductStats]:
+        return await self.__receipt_repository.top_products(user_id, filters, limit)
 
-    def view_receipt_by_public_id(self, public_id: str) -> ReceiptEntity | None:
-        return self.__receipt_repository.get_receipt_by_public_id(public_id)
+    async def count_receipts(
+        self, user_id: int, filters: ReceiptFilters, count_mode: CountMode
+    ) -> int | None:
+        if count_mode == CountMode.NONE:
+            return None
+
+        cached_count = self.__count_cache.get(user_id, filters)
+        if cached_count is not None:
+            return cached_count
+
+        if count_mode == CountMode.ESTIMATE:
+            estimated_count = await self.__receipt_repository.estimate_receipts_count(
+                user_id, filters
+            )
+            if estimated_count is not None:
+                return estimated_count
+
+        count = await self.__receipt_repository.count_receipts(user_id, filters)
+        self.__count_cache.set(user_id, filters, count)
+        return count
+
+    async def view_receipt_by_public_id(self, public_id: UUID) -> ReceiptEntity | None:
+        return await self.__receipt_repository.get_receipt_by_public_id(public_id)
+
+    async def render_receipt_by_public_id(
+        self, public_id: UUID, line_length: int
+    ) -> RenderedReceipt | None:
+        rendered = self.__text_cache.get(public_id, line_length)
+        if rendered:
+            return rendered
+
+        receipt = await self.view_receipt_by_public_id(public_id)
+        if not receipt:
+            return None
+
+        rendered = RenderedReceipt.from_text(
+            generate_receipt_text(receipt, line_length)
+        )
+        self.__text_cache.set(public_id, line_length, rendered)
+        return rendered
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from src.core import settings
+from src.core.cache import TTLCache
+from src.domain.models import ReceiptFilters
+
+
+class ReceiptCountCache:
+    """Exact receipt counts per `(user_id, filters)`, dropped per user on writes"""
+
+    def __init__(self, max_users: int, max_filters_per_user: int, ttl: float) -> None:
+        self.max_filters_per_user = max_filters_per_user
+        self.ttl = ttl
+        self._users: TTLCache[int, TTLCache[ReceiptFilters, int]] = TTLCache(
+            maxsize=max_users, ttl=ttl
+        )
+
+    def get(self, user_id: int, filters: ReceiptFilters) -> Optional[int]:
+        user_counts = self._users.get(user_id)
+        if user_counts is None:
+            return None
+        return user_counts.get(filters)
+
+    def set(self, user_id: int, filters: ReceiptFilters, count: int) -> None:
+        user_counts = self._users.get(user_id)
+        if user_counts is None:
+            user_counts = TTLCache(maxsize=self.max_filters_per_user, ttl=self.ttl)
+            self._users.set(user_id, user_counts)
+        user_counts.set(filters, count)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._users.pop(user_id)
+
+    def clear(self) -> None:
+        self._users.clear()
+
+
+receipt_count_cache = ReceiptCountCache(
+    max_users=settings.RECEIPT_COUNT_CACHE_MAX_USERS,
+    max_filters_per_user=settings.RECEIPT_COUNT_CACHE_MAX_FILTERS_PER_USER,
+    ttl=settings.RECEIPT_COUNT_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,133 @@
+import csv
+import io
+from typing import AsyncIterator, Callable, List
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.core.constants import RECEIPT_EXPORT_BATCH_SIZE, ExportFormat
+from src.core.money import from_minor_units
+from src.db.runner import SessionRunner
+from src.domain.models import ReceiptEntity, ReceiptFilters
+from src.repositories.receipt_repository import AsyncReceiptRepository
+from src.services.receipt_formatting import get_receipt_renderer
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.TEXT: "text/plain; charset=utf-8",
+}
+
+# One row per product, receipt columns are repeated on each of its rows. A
+# receipt without products gets one row with empty product columns.
+CSV_COLUMNS = (
+    "receipt_id",
+    "public_id",
+    "created_at",
+    "payment_type",
+    "payment_amount",
+    "receipt_total",
+    "rest",
+    "product_name",
+    "price",
+    "quantity",
+    "product_total",
+)
+
+
+def encode_ndjson(receipts: List[ReceiptEntity]) -> bytes:
+    return b"".join(
+        orjson.dumps(receipt.to_dict(), option=orjson.OPT_UTC_Z) + b"\n"
+        for receipt in receipts
+    )
+
+
+def encode_csv(receipts: List[ReceiptEntity]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for receipt in receipts:
+        receipt_columns = (
+            receipt.id,
+            receipt.public_id,
+            receipt.created_at.isoformat(),
+            receipt.payment.type.value,
+            from_minor_units(receipt.payment.amount),
+            from_minor_units(receipt.total),
+            from_minor_units(receipt.rest),
+        )
+        if not receipt.products:
+            writer.writerow(receipt_columns + ("", "", "", ""))
+        for product in receipt.products:
+            writer.writerow(
+                receipt_columns
+                + (
+                    product.name,
+                    from_minor_units(product.price),
+                    product.quantity,
+                    from_minor_units(product.total),
+                )
+            )
+    return buffer.getvalue()
+
+
+def encode_csv_header() -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue()
+
+
+class ReceiptExporter:
+    """Streams a user's receipts in one of the export formats.
+
+    Each export opens its own session, because the response body is sent
+    after the request's dependencies have been closed. Output is produced one
+    batch of receipts at a time.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session | AsyncSession],
+        batch_size: int = RECEIPT_EXPORT_BATCH_SIZE,
+    ):
+        self.__session_factory = session_factory
+        self.__batch_size = batch_size
+
+    async def export(
+        self,
+        user_id: int,
+        filters: ReceiptFilters,
+        export_format: ExportFormat,
+        line_length: int = 32,
+    ) -> AsyncIterator[str | bytes]:
+        encode = self.__encoder(export_format, line_length)
+        if export_format == ExportFormat.CSV:
+            yield encode_csv_header()
+
+        db_session = self.__session_factory()
+        try:
+            repository = AsyncReceiptRepository(SessionRunner.for_session(db_session))
+            async for receipts in repository.iter_receipt_batches(
+                user_id, filters, self.__batch_size
+            ):
+                yield encode(receipts)
+        finally:
+            if isinstance(db_session, AsyncSession):
+                await db_session.close()
+            else:
+                db_session.close()
+
+    @staticmethod
+    def __encoder(
+        export_format: ExportFormat, line_length: int
+    ) -> Callable[[List[ReceiptEntity]], str | bytes]:
+        if export_format == ExportFormat.NDJSON:
+            return encode_ndjson
+        if export_format == ExportFormat.CSV:
+            return encode_csv
+
+        renderer = get_receipt_renderer(line_length)
+        # Receipts are separated by an empty line, the same as on paper.
+        return lambda receipts: "".join(
+            renderer.render(receipt) + "\n\n" for receipt in receipts
+        )
@@ -1,61 +1,138 @@
-from src.core.constants import PaymentType
+from functools import lru_cache
+from typing import Iterator, List, Tuple
+
+from src.core.constants import (
+    RECEIPT_LINE_LENGTH_MAX,
+    RECEIPT_LINE_LENGTH_MIN,
+    PaymentType,
+)
+from src.core.money import from_minor_units
 from src.domain.models import ReceiptEntity
 
+SHOP_NAME = "ФОП Джонсонюк Борис"
+FAREWELL = "Дякуємо за покупку!"
 
-def generate_receipt_text(receipt: ReceiptEntity, line_length: int = 32) -> str:
-    def center_text(text: str) -> str:
-        return text.center(line_length)
-
-    def format_quantity_price_line(quantity: float, price: float) -> str:
-        return f"{quantity:.2f} x {price:,.2f}".replace(",", " ").ljust(line_length)
-
-    def format_product_name_line(product_name: str, total: float) -> str:
-        words = product_name.split()
-        product_lines = []
-        current_line = ""
-
-        for word in words:
-            if len(current_line) + len(word) + 1 <= line_length // 2:
-                if current_line:
-                    current_line += " "
-                current_line += word
-            else:
-                product_lines.append(current_line)
-                current_line = word
-
-        if current_line:
-            product_lines.append(current_line)
-
-        product_lines[-1] = f"{product_lines[-1]}".ljust(
-            line_length // 2
-        ) + f"{total:,.2f}".replace(",", " ").rjust(line_length // 2)
-
-        return "\n".join(product_lines)
-
-    def format_total(label: str, value: float) -> str:
-        return f"{label}".ljust(line_length // 2) + f"{value:,.2f}".replace(
-            ",", " "
-        ).rjust(line_length // 2)
-
-    lines = [center_text("ФОП Джонсонюк Борис"), "=" * line_length]
-
-    for index, product in enumerate(receipt.products):
-        lines.append(format_quantity_price_line(product.quantity, product.price))
-        lines.append(format_product_name_line(product.name, product.total))
-        if index < len(receipt.products) - 1:
-            lines.append("-" * line_length)
-
-    lines.append("=" * line_length)
-    lines.append(format_total("СУМА", receipt.total))
-    lines.append(
-        format_total(
-            "Картка" if receipt.payment.type == PaymentType.CARD else "Готівка",
-            receipt.payment.amount,
+
+def format_amount(amount: int) -> str:
+    """`amount` kopecks as hryvnias, e.g. "2 988.70" for 298870"""
+    return f"{from_minor_units(amount):,.2f}".replace(",", " ")
+
+
+class ReceiptRenderer:
+    """Text layout of receipts for a fixed line length.
+
+    Everything that only depends on the line length is computed once, so a
+    renderer can be reused for any number of receipts. Use `render` for the
+    whole text or `iter_lines` to stream it line by line.
+    """
+
+    def __init__(self, line_length: int = 32) -> None:
+        self.line_length = line_length
+        self.half_length = line_length // 2
+        self.head = (SHOP_NAME.center(line_length), "=" * line_length)
+        self.double_rule = "=" * line_length
+        self.single_rule = "-" * line_length
+        self.footer = FAREWELL.center(line_length)
+        self.total_label = "СУМА".ljust(self.half_length)
+        self.card_label = "Картка".ljust(self.half_length)
+        self.cash_label = "Готівка".ljust(self.half_length)
+        self.rest_label = "Решта".ljust(self.half_length)
+
+    def render(self, receipt: ReceiptEntity) -> str:
+        lines = list(self.head)
+        single_rule = self.single_rule
+        product_lines = self.product_lines
+
+        for index, product in enumerate(receipt.products):
+            if index:
+                lines.append(single_rule)
+            lines.extend(product_lines(product.name, product.price, product.quantity))
+
+        lines.extend(self.tail_lines(receipt))
+        return "\n".join(lines)
+
+    def iter_lines(self, receipt: ReceiptEntity) -> Iterator[str]:
+        """Lines of `render` without line breaks, one product at a time"""
+        yield from self.head
+
+        for index, product in enumerate(receipt.products):
+            if index:
+                yield self.single_rule
+            yield from self.product_lines(product.name, product.price, product.quantity)
+
+        yield from self.tail_lines(receipt)
+
+    def tail_lines(self, receipt: ReceiptEntity) -> List[str]:
+        half_length = self.half_length
+        payment_label = (
+            self.card_label
+            if receipt.payment.type == PaymentType.CARD
+            else self.cash_label
         )
-    )
-    lines.append(format_total("Решта", receipt.rest))
-    lines.append("=" * line_length)
-    lines.append(center_text(receipt.created_at.strftime("%d.%m.%Y %H:%M")))
-    lines.append(center_text("Дякуємо за покупку!"))
+        return [
+            self.double_rule,
+            self.total_label + format_amount(receipt.total).rjust(half_length),
+            payment_label + format_amount(receipt.payment.amount).rjust(half_length),
+            self.rest_label + format_amount(receipt.rest).rjust(half_length),
+            self.double_rule,
+            receipt.created_at.strftime("%d.%m.%Y %H:%M").center(self.line_length),
+            self.footer,
+        ]
 
-    return "\n".join(lines)
+    def product_lines(self, name: str, price: int, quantity: float) -> Tuple[str, ...]:
+        name_lines = self.wrap_product_name(name)
+        name_lines[-1] = name_lines[-1].ljust(self.half_length) + format_amount(
+            price * quantity
+        ).rjust(self.half_length)
+        quantity_line = f"{quantity:.2f} x {format_amount(price)}".ljust(
+            self.line_length
+        )
+        return (quantity_line, *name_lines)
+
+    def wrap_product_name(self, product_name: str) -> List[str]:
+        # Greedy wrap into half-line columns. A word that does not fit closes
+        # the current line even when it is empty, as the layout always did.
+        lines = []
+        words = []
+        width = 0
+        half_length = self.half_length
+
+        for word in product_name.split():
+            if not words:
+                if len(word) + 1 <= half_length:
+                    words.append(word)
+                    width = len(word)
+                    continue
+            elif width + len(word) + 1 <= half_length:
+                words.append(word)
+                width += len(word) + 1
+                continue
+
+            lines.append(" ".join(words))
+            words = [word]
+            width = len(word)
+
+        if words or not lines:
+            lines.append(" ".join(words))
+
+        return lines
+
+
+def get_receipt_renderer(line_length: int = 32) -> ReceiptRenderer:
+    # Renderers hold lines of `line_length` characters, the cache must not be
+    # filled with arbitrarily long ones.
+    if not RECEIPT_LINE_LENGTH_MIN <= line_length <= RECEIPT_LINE_LENGTH_MAX:
+        raise ValueError(
+            f"Line length must be between {RECEIPT_LINE_LENGTH_MIN}"
+            f" and {RECEIPT_LINE_LENGTH_MAX}, got {line_length}"
+        )
+    return _cached_receipt_renderer(line_length)
+
+
+@lru_cache(maxsize=RECEIPT_LINE_LENGTH_MAX - RECEIPT_LINE_LENGTH_MIN + 1)
+def _cached_receipt_renderer(line_length: int) -> ReceiptRenderer:
+    return ReceiptRenderer(line_length)
+
+
+def generate_receipt_text(receipt: ReceiptEntity, line_length: int = 32) -> str:
+    return get_receipt_renderer(line_length).render(receipt)
@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Callable, List
+
+from sqlalchemy.exc import DBAPIError, IntegrityError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from src.core import settings
+from src.db.routing import RecentWrites, recent_writes
+from src.db.session import SessionLocal
+from src.repositories.receipt_repository import ReceiptRepository
+from src.services.receipt_counts import ReceiptCountCache, receipt_count_cache
+from src.services.receipt_queue import QueuedReceipt, ReceiptQueue, receipt_queue
+
+logger = logging.getLogger(__name__)
+
+# Raised for receipts the database or its driver refuses, e.g. an amount too
+# large for a bigint column, which SQLite reports as `OverflowError`.
+RECEIPT_ERRORS = (DBAPIError, OverflowError, ValueError, TypeError)
+
+
+def is_connection_error(error: Exception) -> bool:
+    """Whether `error` is about the database being unavailable, not a receipt"""
+    if isinstance(error, (OperationalError, InterfaceError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class ReceiptIngestionWorker:
+    """Stores receipts of the `ReceiptQueue` in the database in micro-batches.
+
+    Each batch is saved in one transaction and removed from the queue after it
+    is committed. A crash in between stores the batch again on the next run,
+    receipts that are already in the database are recognised by `public_id`
+    and only removed. A receipt the database rejects is marked failed in the
+    queue so that it does not hold up the others, only connection errors keep
+    a batch queued to be retried.
+    """
+
+    def __init__(
+        self,
+        queue: ReceiptQueue,
+        session_factory: Callable[[], Session],
+        count_cache: ReceiptCountCache,
+        writes: RecentWrites,
+        batch_size: int,
+    ) -> None:
+        self.queue = queue
+        self.session_factory = session_factory
+        self.count_cache = count_cache
+        self.writes = writes
+        self.batch_size = batch_size
+
+    def drain(self) -> int:
+        """Store batches until the queue is empty, return the number stored"""
+        stored = 0
+        while batch := self.queue.take(self.batch_size):
+            stored += self._store(batch)
+        return stored
+
+    def _store(self, batch: List[QueuedReceipt]) -> int:
+        try:
+            with self.session_factory() as db_session:
+                ReceiptRepository(db_session).save_receipts(
+                    [queued.receipt for queued in batch]
+                )
+        except RECEIPT_ERRORS as e:
+            if is_connection_error(e):
+                raise
+            # Some receipt spoils the whole batch, find out which one.
+            return sum(self._store_one(queued) for queued in batch)
+
+        self.queue.remove([queued.seq for queued in batch])
+        self._mark_written({queued.receipt.user_id for queued in batch})
+        return len(batch)
+
+    def _store_one(self, queued: QueuedReceipt) -> int:
+        receipt = queued.receipt
+        with self.session_factory() as db_session:
+            repository = ReceiptRepository(db_session)
+            try:
+                repository.save_receipts([receipt])
+            except RECEIPT_ERRORS as e:
+                if is_connection_error(e):
+                    raise
+                db_session.rollback()
+                if isinstance(e, IntegrityError) and (
+                    repository.get_receipt_id_by_public_id(
+                        receipt.public_id, receipt.user_id
+                    )
+                ):
+                    # Stored before, the queue just did not get to know.
+                    self.queue.remove([queued.seq])
+                    return 0
+                logger.error("Receipt %s cannot be stored: %s", receipt.public_id, e)
+                self.queue.fail(
+                    queued.seq, str(e.orig if isinstance(e, DBAPIError) else e)
+                )
+                return 0
+
+        self.queue.remove([queued.seq])
+        self._mark_written({receipt.user_id})
+        return 1
+
+    def _mark_written(self, user_ids: set) -> None:
+        for user_id in user_ids:
+            self.count_cache.invalidate_user(user_id)
+            self.writes.mark(user_id)
+
+    async def run(self, poll_interval: float, retry_interval: float) -> None:
+        """Drain the queue forever, checking for new receipts when it is empty"""
+        while True:
+            try:
+                await run_in_threadpool(self.drain)
+            except Exception:
+                # The batch stays queued, e.g. until the database is back.
+                logger.exception("Storing queued receipts failed")
+                await asyncio.sleep(retry_interval)
+                continue
+            await asyncio.sleep(poll_interval)
+
+
+receipt_ingestion_worker = ReceiptIngestionWorker(
+    queue=receipt_queue,
+    session_factory=SessionLocal,
+    count_cache=receipt_count_cache,
+    writes=recent_writes,
+    batch_size=settings.RECEIPT_QUEUE_BATCH_SIZE,
+)
@@ -0,0 +1,213 @@
+import datetime
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+import orjson
+
+from src.core import settings
+from src.core.constants import PaymentType
+from src.domain.models import PaymentEntity, ProductEntity, ReceiptEntity
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queued_receipt (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    public_id TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    enqueued_at REAL NOT NULL,
+    failed_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_queued_receipt_pending
+    ON queued_receipt (seq) WHERE failed_at IS NULL;
+"""
+
+
+class ReceiptQueueFullError(Exception):
+    def __init__(self) -> None:
+        self.message = "Too many receipts waiting to be stored, try again later"
+        super().__init__(self.message)
+
+
+@dataclass(frozen=True, slots=True)
+class QueuedReceipt:
+    seq: int
+    receipt: ReceiptEntity
+    # Why the receipt could not be stored, `None` while it is pending
+    error: Optional[str] = None
+
+
+def encode_receipt(receipt: ReceiptEntity) -> bytes:
+    return orjson.dumps(
+        {
+            "user_id": receipt.user_id,
+            "public_id": receipt.public_id,
+            "created_at": receipt.created_at,
+            "total": receipt.total,
+            "rest": receipt.rest,
+            "payment": [receipt.payment.type, receipt.payment.amount],
+            "products": [
+                [product.name, product.price, product.quantity]
+                for product in receipt.products
+            ],
+        }
+    )
+
+
+def decode_receipt(payload: bytes) -> ReceiptEntity:
+    data = orjson.loads(payload)
+    payment_type, payment_amount = data["payment"]
+    return ReceiptEntity(
+        user_id=data["user_id"],
+        public_id=UUID(data["public_id"]),
+        created_at=datetime.datetime.fromisoformat(data["created_at"]),
+        total=data["total"],
+        rest=data["rest"],
+        payment=PaymentEntity(amount=payment_amount, type=PaymentType(payment_type)),
+        products=tuple(
+            ProductEntity(name=name, price=price, quantity=quantity)
+            for name, price, quantity in data["products"]
+        ),
+    )
+
+
+class ReceiptQueue:
+    """Durable local queue of receipts accepted but not stored in the database.
+
+    Receipts are kept in a SQLite file in WAL mode and fsynced on every
+    `put`, so an accepted receipt survives a crash of the process. Receipts
+    are removed once stored and kept with the error when they never can be.
+    At most `max_size` receipts may be pending, `put` raises
+    `ReceiptQueueFullError` beyond that.
+    """
+
+    def __init__(self, path: str, max_size: int) -> None:
+        self.path = path
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Called with the lock held, the file is only created once used.
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def reopen(self, path: str) -> None:
+        """Switch to the queue stored at `path`"""
+        self.close()
+        with self._lock:
+            self.path = path
+
+    def close(self) -> None:
+        with self._lock:
+            connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.close()
+
+    def put(self, receipts: Sequence[ReceiptEntity]) -> None:
+        """Append receipts, all or none of them"""
+        now = time.time()
+        rows = [(str(r.public_id), r.user_id, encode_receipt(r), now) for r in receipts]
+        with self._lock:
+            connection = self._connect()
+            # IMMEDIATE takes the write lock up front, so the size check holds
+            # for other processes sharing the file too.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                (pending,) = connection.execute(
+                    "SELECT count(*) FROM queued_receipt WHERE failed_at IS NULL"
+                ).fetchone()
+                if pending + len(rows) > self.max_size:
+                    raise ReceiptQueueFullError()
+                connection.executemany(
+                    "INSERT INTO queued_receipt (public_id, user_id, payload,"
+                    " enqueued_at) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def take(self, limit: int) -> List[QueuedReceipt]:
+        """Oldest pending receipts, they stay queued until removed"""
+        with self._lock:
+            rows = (
+                self._connect()
+                .execute(
+                    "SELECT seq, payload FROM queued_receipt WHERE failed_at IS NULL"
+                    " ORDER BY seq LIMIT ?",
+                    (limit,),
+                )
+                .fetchall()
+            )
+        return [QueuedReceipt(seq, decode_receipt(payload)) for seq, payload in rows]
+
+    def remove(self, seqs: Sequence[int]) -> None:
+        with self._lock:
+            self._connect().executemany(
+                "DELETE FROM queued_receipt WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def fail(self, seq: int, error: str) -> None:
+        """Keep a receipt that cannot be stored out of the way, with the reason"""
+        with self._lock:
+            self._connect().execute(
+                "UPDATE queued_receipt SET failed_at = ?, error = ? WHERE seq = ?",
+                (time.time(), error, seq),
+            )
+
+    def get(self, public_id: UUID) -> Optional[QueuedReceipt]:
+        with self._lock:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT seq, payload, error FROM queued_receipt"
+                    " WHERE public_id = ?",
+                    (str(public_id),),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        seq, payload, error = row
+        return QueuedReceipt(seq, decode_receipt(payload), error)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending, failed, oldest_enqueued_at = (
+                self._connect()
+                .execute(
+                    "SELECT count(*) FILTER (WHERE failed_at IS NULL),"
+                    " count(*) FILTER (WHERE failed_at IS NOT NULL),"
+                    " min(enqueued_at) FILTER (WHERE failed_at IS NULL)"
+                    " FROM queued_receipt"
+                )
+                .fetchone()
+            )
+        return {
+            "pending": pending,
+            "failed": failed,
+            "max_size": self.max_size,
+            "oldest_pending_seconds": (
+                None
+                if oldest_enqueued_at is None
+                else round(time.time() - oldest_enqueued_at, 3)
+            ),
+        }
+
+
+receipt_queue = ReceiptQueue(
+    path=settings.RECEIPT_QUEUE_PATH, max_size=settings.RECEIPT_QUEUE_MAX_SIZE
+)
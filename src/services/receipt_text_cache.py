@@ -0,0 +1,79 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from uuid import UUID
+
+from src.core import settings
+
+
+@dataclass(frozen=True)
+class RenderedReceipt:
+    text: str
+    etag: str
+
+    @classmethod
+    def from_text(cls, text: str) -> "RenderedReceipt":
+        digest = hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+        return cls(text=text, etag=f'"{digest}"')
+
+    @property
+    def size(self) -> int:
+        return len(self.text.encode())
+
+
+class RenderedReceiptCache:
+    """LRU of rendered receipt texts bounded by entry count and total size.
+
+    Receipts never change once created, so entries only leave on eviction.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[UUID, int], RenderedReceipt]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, public_id: UUID, line_length: int) -> Optional[RenderedReceipt]:
+        key = (public_id, line_length)
+        with self._lock:
+            rendered = self._entries.get(key)
+            if rendered is not None:
+                self._entries.move_to_end(key)
+            return rendered
+
+    def set(self, public_id: UUID, line_length: int, rendered: RenderedReceipt) -> None:
+        if rendered.size > self.max_bytes:
+            return
+
+        key = (public_id, line_length)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+
+            self._entries[key] = rendered
+            self._bytes += rendered.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+rendered_receipt_cache = RenderedReceiptCache(
+    max_entries=settings.RECEIPT_TEXT_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RECEIPT_TEXT_CACHE_MAX_BYTES,
+)
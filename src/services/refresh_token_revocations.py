@@ -0,0 +1,44 @@
+import time
+from uuid import UUID
+
+from src.core import settings
+from src.core.cache import TTLCache
+
+
+class RevokedRefreshTokens:
+    """Process-local front for the revocations stored in `refresh_token`.
+
+    Remembers refresh tokens this process has rotated and families it has
+    revoked, so a replayed token is rejected with a set lookup instead of a
+    database round trip. The table stays the source of truth: anything not
+    found here, e.g. revoked by another process, is still checked there.
+    Entries are dropped once the tokens they cover have expired.
+    """
+
+    def __init__(self, maxsize: int, family_ttl: float) -> None:
+        # Every token of a revoked family expires within one refresh token
+        # lifetime, since the family no longer gets new tokens.
+        self._tokens: TTLCache[UUID, bool] = TTLCache(maxsize=maxsize, ttl=family_ttl)
+        self._families: TTLCache[UUID, bool] = TTLCache(maxsize=maxsize, ttl=family_ttl)
+
+    def revoke_token(self, token_id: UUID, expires_at: float) -> None:
+        self._tokens.set(token_id, True, ttl=expires_at - time.time())
+
+    def revoke_family(self, family_id: UUID) -> None:
+        self._families.set(family_id, True)
+
+    def is_token_revoked(self, token_id: UUID) -> bool:
+        return self._tokens.get(token_id, False)
+
+    def is_family_revoked(self, family_id: UUID) -> bool:
+        return self._families.get(family_id, False)
+
+    def clear(self) -> None:
+        self._tokens.clear()
+        self._families.clear()
+
+
+revoked_refresh_tokens = RevokedRefreshTokens(
+    maxsize=settings.REVOKED_REFRESH_TOKENS_MAX_SIZE,
+    family_ttl=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+)
@@ -0,0 +1,63 @@
+from typing import Optional, Protocol
+
+from src.core import settings
+from src.core.cache import TTLCache
+from src.domain.models import UserEntity
+
+
+class UserCacheBackend(Protocol):
+    """Storage for cached user identities, e.g. process-local or a shared store"""
+
+    def get(self, username: str) -> Optional[UserEntity]: ...
+
+    def set(self, username: str, user: UserEntity) -> None: ...
+
+    def delete(self, username: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+
+class LocalUserCacheBackend:
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._cache: TTLCache[str, UserEntity] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, username: str) -> Optional[UserEntity]:
+        return self._cache.get(username)
+
+    def set(self, username: str, user: UserEntity) -> None:
+        self._cache.set(username, user)
+
+    def delete(self, username: str) -> None:
+        self._cache.pop(username)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class UserCache:
+    """Identity of authenticated users keyed by the token subject (username)"""
+
+    def __init__(self, backend: UserCacheBackend) -> None:
+        self.backend = backend
+
+    def use_backend(self, backend: UserCacheBackend) -> None:
+        self.backend = backend
+
+    def get(self, username: str) -> Optional[UserEntity]:
+        return self.backend.get(username)
+
+    def set(self, user: UserEntity) -> None:
+        self.backend.set(user.username, user)
+
+    def invalidate(self, username: str) -> None:
+        self.backend.delete(username)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+
+user_cache = UserCache(
+    LocalUserCacheBackend(
+        maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS
+    )
+)
@@ -1,10 +1,31 @@
+import os
+from contextlib import contextmanager
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import sessionmaker
-
-from src.db.session import Base
-from src.main import app
+from sqlalchemy.pool import NullPool
+
+# Cheap bcrypt keeps the suite fast, must be set before settings are loaded.
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "2")
+os.environ.setdefault("INTERNAL_API_ENABLED", "true")
+os.environ.setdefault("INTERNAL_API_TOKEN", "internal-test-token")
+
+from src.api.rate_limit import rate_limiter  # noqa: E402
+from src.core.token_verifier import token_verifier  # noqa: E402
+from src.db.routing import recent_writes  # noqa: E402
+from src.db.session import Base, create_async_session_factory  # noqa: E402
+from src.dependencies.db import get_db_session, get_db_session_factory  # noqa: E402
+from src.main import app  # noqa: E402
+from src.services.receipt_counts import receipt_count_cache  # noqa: E402
+from src.services.receipt_text_cache import rendered_receipt_cache  # noqa: E402
+from src.services.refresh_token_revocations import (  # noqa: E402
+    revoked_refresh_tokens,
+)
+from src.services.user_cache import user_cache  # noqa: E402
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
@@ -13,12 +34,45 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The same database through aiosqlite, for routes on the asyncio session runner.
+# Each TestClient runs its own event loop, so connections are not pooled.
+async_engine = create_async_engine(
+    "sqlite+aiosqlite:///./test.db", poolclass=NullPool
+)
+AsyncTestingSessionLocal = create_async_session_factory(async_engine)
+
 # Create the testing database
 Base.metadata.create_all(bind=engine)
 
 
+def override_get_db_session():
+    db = TestingSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def override_get_async_db_session():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+
+app.dependency_overrides[get_db_session] = override_get_db_session
+app.dependency_overrides[get_db_session_factory] = lambda: TestingSessionLocal
+
+
+def pytest_generate_tests(metafunc):
+    # `pytestmark = pytest.mark.db_runners("sync", "async")` runs every test of
+    # a module that uses the client once per session runner.
+    marker = metafunc.definition.get_closest_marker("db_runners")
+    if marker and "db_runner" in metafunc.fixturenames:
+        metafunc.parametrize("db_runner", marker.args, indirect=True)
+
+
 @pytest.fixture(scope="function")
-def get_db_session():
+def db_session():
+    """Fixture for a session on the testing database"""
     db = TestingSessionLocal()
     try:
         yield db
@@ -26,21 +80,83 @@ def get_db_session():
         db.close()
 
 
-app.dependency_overrides[get_db_session] = get_db_session
+@contextmanager
+def capture_queries():
+    """Collect every SQL statement sent to the testing database"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engines = (engine, async_engine.sync_engine)
+    for listened_engine in engines:
+        event.listen(listened_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for listened_engine in engines:
+            event.remove(
+                listened_engine, "before_cursor_execute", before_cursor_execute
+            )
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """Fail if the wrapped block sends more than `limit` SQL statements"""
+    with capture_queries() as statements:
+        yield statements
+    assert len(statements) <= limit, (
+        f"Expected at most {limit} queries, got {len(statements)}:\n"
+        + "\n".join(statements)
+    )
+
+
+@pytest.fixture(scope="function")
+def count_queries():
+    """Fixture exposing `capture_queries` to tests"""
+    return capture_queries
+
+
+@pytest.fixture(scope="function")
+def max_queries():
+    """Fixture exposing `assert_max_queries` to tests"""
+    return assert_max_queries
+
+
+@pytest.fixture(scope="function")
+def db_runner(request):
+    """Session runner of the client's routes, `sync` unless parametrized"""
+    return getattr(request, "param", "sync")
 
 
 @pytest.fixture(scope="function")
-def client():
+def client(db_runner):
     """Fixture for test client"""
+    previous_overrides = dict(app.dependency_overrides)
+    if db_runner == "async":
+        app.dependency_overrides[get_db_session] = override_get_async_db_session
+        app.dependency_overrides[get_db_session_factory] = (
+            lambda: AsyncTestingSessionLocal
+        )
+
     Base.metadata.create_all(bind=engine)
     with TestClient(app) as c:
         yield c
     Base.metadata.drop_all(bind=engine)
+    app.dependency_overrides.clear()
+    app.dependency_overrides.update(previous_overrides)
+    receipt_count_cache.clear()
+    rendered_receipt_cache.clear()
+    user_cache.clear()
+    recent_writes.clear()
+    token_verifier.clear()
+    revoked_refresh_tokens.clear()
+    rate_limiter.clear()
 
 
 @pytest.fixture(scope="function")
-def access_token(client):
-    """Fixture for getting access token"""
+def auth_tokens(client):
+    """Fixture for signing up and in, returns the access and refresh tokens"""
     client.post(
         "api/auth/signup",
         json={
@@ -53,7 +169,19 @@ def access_token(client):
     response = client.post(
         "api/auth/signin", data={"username": "johndoe", "password": "password123"}
     )
-    return response.json()["access_token"]
+    return response.json()
+
+
+@pytest.fixture(scope="function")
+def access_token(auth_tokens):
+    """Fixture for getting access token"""
+    return auth_tokens["access_token"]
+
+
+@pytest.fixture(scope="function")
+def internal_headers():
+    """Fixture for headers that authorize internal API requests"""
+    return {"X-Internal-Token": os.environ["INTERNAL_API_TOKEN"]}
 
 
 def create_receipt(client, access_token):
@@ -87,3 +215,13 @@ def receipt_public_id(client, access_token):
     """Fixture for creating a receipt and returning its public ID"""
     receipt = create_receipt(client, access_token)
     return receipt["public_id"]
+
+
+@pytest.fixture(scope="function")
+def make_receipt(client, access_token):
+    """Fixture returning a factory that creates receipts for the current user"""
+
+    def _make_receipt():
+        return create_receipt(client, access_token)
+
+    return _make_receipt
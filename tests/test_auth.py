@@ -1,4 +1,19 @@
-from datetime import datetime
+import uuid
+from datetime import UTC, datetime, timedelta
+
+import jwt
+import pytest
+from passlib.context import CryptContext
+
+from src.core.password_hashing import password_hasher
+from src.core.security import generate_access_token, generate_jwt_token, user_claims
+from src.core.token_verifier import JWT_ALGORITHM, TokenVerifier
+from src.db.models.refresh_token import RefreshToken
+from src.db.models.user import User
+from src.repositories.refresh_token_repository import RefreshTokenRepository
+from src.services.refresh_token_revocations import revoked_refresh_tokens
+
+pytestmark = pytest.mark.db_runners("sync", "async")
 
 
 def test_successful_signup(client):
@@ -86,3 +101,134 @@ def test_refresh_token_with_invalid_token(client):
     )
     assert response.status_code == 401
     assert response.json()["detail"] == "Could not validate credentials"
+
+
+def test_receipt_routes_do_not_load_user_row(client, access_token, count_queries):
+    with count_queries() as statements:
+        response = client.get(
+            "/api/receipts", headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+    assert response.status_code == 200
+    assert not any("password_hash" in statement for statement in statements)
+
+
+def test_token_without_user_id_uses_cached_user(client, access_token, count_queries):
+    legacy_token = generate_access_token("johndoe")
+    headers = {"Authorization": f"Bearer {legacy_token}"}
+
+    with count_queries() as first_request_statements:
+        assert client.get("/api/receipts", headers=headers).status_code == 200
+    with count_queries() as second_request_statements:
+        assert client.get("/api/receipts", headers=headers).status_code == 200
+
+    assert any("password_hash" in s for s in first_request_statements)
+    assert not any("password_hash" in s for s in second_request_statements)
+
+
+def test_login_rehashes_password_with_outdated_cost(client, db_session):
+    legacy_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("password")
+    user = User(name="Legacy", username="legacy", password_hash=legacy_hash)
+    db_session.add(user)
+    db_session.commit()
+
+    response = client.post(
+        "api/auth/signin", data={"username": "legacy", "password": "password"}
+    )
+
+    assert response.status_code == 200
+    db_session.refresh(user)
+    assert not user.password_hash.startswith("$2b$04$")
+
+
+def test_login_rejected_when_password_hasher_is_saturated(
+    client, access_token, monkeypatch
+):
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+
+    response = client.post(
+        "api/auth/signin", data={"username": "johndoe", "password": "password123"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_expired_token_is_rejected(client):
+    expired_token = generate_jwt_token(user_claims("johndoe", 1, "access"), -1)
+    response = client.get(
+        "/api/receipts", headers={"Authorization": f"Bearer {expired_token}"}
+    )
+
+    assert response.status_code == 401
+
+
+def test_token_verifier_caches_verified_tokens(client, access_token, internal_headers):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    client.get("/api/receipts", headers=headers)
+    client.get("/api/receipts", headers=headers)
+
+    stats = client.get(
+        "/api/internal/auth/token-cache", headers=internal_headers
+    ).json()
+    assert stats["hits"] >= 1
+    assert stats["size"] >= 1
+
+
+def test_token_verifier_accepts_rotated_keys():
+    def sign(key_id, key):
+        claims = {"sub": "johndoe", "exp": datetime.now().timestamp() + 60}
+        headers = {"kid": key_id} if key_id else None
+        return jwt.encode(claims, key, algorithm=JWT_ALGORITHM, headers=headers)
+
+    verifier = TokenVerifier(keys={"default": "old", "2026-10": "new"}, maxsize=10)
+
+    assert verifier.verify(sign("2026-10", "new"))["sub"] == "johndoe"
+    # Tokens without `kid` were signed with the key before rotation.
+    assert verifier.verify(sign(None, "old"))["sub"] == "johndoe"
+    assert verifier.verify(sign("2026-10", "old")) is None
+    assert verifier.verify(sign("retired", "retired")) is None
+    assert verifier.stats() == {"hits": 0, "misses": 4, "size": 2}
+
+
+def refresh(client, refresh_token):
+    return client.post("api/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_refresh_token(client, auth_tokens):
+    response = refresh(client, auth_tokens["refresh_token"])
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != auth_tokens["refresh_token"]
+    response = client.get(
+        "/api/receipts",
+        headers={"Authorization": f"Bearer {rotated['access_token']}"},
+    )
+    assert response.status_code == 200
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+
+def test_reused_refresh_token_revokes_family(client, auth_tokens):
+    rotated = refresh(client, auth_tokens["refresh_token"]).json()
+
+    assert refresh(client, auth_tokens["refresh_token"]).status_code == 401
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+
+    # The revocation is stored, not only remembered by this process.
+    revoked_refresh_tokens.clear()
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+
+
+def test_refresh_token_without_id_is_rejected(client, auth_tokens):
+    legacy_token = generate_jwt_token(user_claims("johndoe", 1, "refresh"), 10)
+
+    assert refresh(client, legacy_token).status_code == 401
+
+
+def test_purge_expired_refresh_tokens(client, auth_tokens, db_session):
+    repository = RefreshTokenRepository(db_session)
+    repository.add(uuid.uuid4(), uuid.uuid4(), 1, datetime.now(UTC) - timedelta(1))
+
+    assert repository.purge_expired() == 1
+    assert db_session.query(RefreshToken).count() == 1
@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from src.db.pool_metrics import InstrumentedQueuePool, pool_snapshot
+
+
+def test_db_pool_stats(client, internal_headers):
+    response = client.get("/api/internal/db/pools", headers=internal_headers)
+
+    assert response.status_code == 200
+    assert "primary" in response.json()
+
+
+@pytest.mark.parametrize("token", [None, "wrong-token"])
+def test_internal_api_requires_token(client, token):
+    headers = {"X-Internal-Token": token} if token else {}
+
+    response = client.get("/api/internal/db/pools", headers=headers)
+
+    assert response.status_code == 403
+
+
+def test_instrumented_pool_records_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        stats = pool_snapshot(engine.pool)
+
+    assert stats["checked_out"] == 1
+    assert stats["max_checked_out"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_time_seconds"]["count"] == 2
+    assert stats["wait_time_seconds"]["buckets"]["+Inf"] == 2
@@ -0,0 +1,53 @@
+from src.api.rate_limit import LocalRateLimitBackend, RateLimit
+from src.core import settings
+
+
+def test_token_bucket_allows_burst_then_refills():
+    now = [0.0]
+    backend = LocalRateLimitBackend(max_buckets=100, timer=lambda: now[0])
+    limit = RateLimit(requests=2, seconds=10)
+
+    assert backend.acquire("client", limit) == 0
+    assert backend.acquire("client", limit) == 0
+    assert backend.acquire("client", limit) == 5
+    assert backend.acquire("other", limit) == 0
+
+    now[0] = 5.0
+    assert backend.acquire("client", limit) == 0
+    assert backend.acquire("client", limit) == 5
+
+
+def test_signin_is_rate_limited_per_address(client):
+    for _ in range(settings.AUTH_RATE_LIMIT_PER_MINUTE):
+        response = client.post(
+            "api/auth/signin", data={"username": "nobody", "password": "wrong"}
+        )
+        assert response.status_code == 401
+
+    response = client.post(
+        "api/auth/signin", data={"username": "nobody", "password": "wrong"}
+    )
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_receipt_creation_is_limited_per_user(client, access_token):
+    from src.api.rate_limit import rate_limiter
+
+    def request_scope(method, address):
+        return {
+            "type": "http",
+            "method": method,
+            "path": "/api/receipts",
+            "headers": [(b"authorization", f"Bearer {access_token}".encode())],
+            "client": (address, 50000),
+        }
+
+    for _ in range(settings.RECEIPT_CREATE_RATE_LIMIT_PER_MINUTE):
+        assert rate_limiter.check(request_scope("POST", "10.0.0.1")) == 0
+
+    assert rate_limiter.check(request_scope("POST", "10.0.0.1")) > 0
+    # The bucket belongs to the user, not to the terminal's address.
+    assert rate_limiter.check(request_scope("POST", "10.0.0.2")) > 0
+    assert rate_limiter.check(request_scope("GET", "10.0.0.1")) == 0
@@ -0,0 +1,73 @@
+import dataclasses
+import datetime
+
+import pytest
+
+from src.core.constants import (
+    RECEIPT_LINE_LENGTH_MAX,
+    RECEIPT_LINE_LENGTH_MIN,
+    PaymentType,
+)
+from src.domain.models import PaymentEntity, ProductEntity, ReceiptEntity
+from src.services.receipt_formatting import (
+    generate_receipt_text,
+    get_receipt_renderer,
+)
+
+EXPECTED_TEXT = """\
+      ФОП Джонсонюк Борис       
+================================
+3.00 x 298 870.00               
+Mavic 3T              896 610.00
+--------------------------------
+2.00 x 31 000.00                
+Дрон FPV з
+акумулятором 6S        62 000.00
+================================
+СУМА                  958 610.00
+Готівка             1 000 000.00
+Решта                  41 390.00
+================================
+        09.10.2024 14:11        
+      Дякуємо за покупку!       """
+
+
+def build_receipt() -> ReceiptEntity:
+    receipt = ReceiptEntity(
+        user_id=1,
+        products=(
+            ProductEntity(name="Mavic 3T", price=29887000, quantity=3),
+            ProductEntity(name="Дрон FPV з акумулятором 6S", price=3100000, quantity=2),
+        ),
+        payment=PaymentEntity(amount=100000000, type=PaymentType.CASH),
+        created_at=datetime.datetime(2024, 10, 9, 14, 11),
+    )
+    return receipt.with_totals()
+
+
+def test_generate_receipt_text_layout():
+    assert generate_receipt_text(build_receipt(), line_length=32) == EXPECTED_TEXT
+
+
+def test_iter_lines_streams_the_rendered_text():
+    renderer = get_receipt_renderer(32)
+    receipt = build_receipt()
+
+    assert "\n".join(renderer.iter_lines(receipt)) == renderer.render(receipt)
+
+
+def test_empty_product_name_renders_blank_name_line():
+    receipt = build_receipt()
+    products = (dataclasses.replace(receipt.products[0], name=""),)
+    receipt = dataclasses.replace(receipt, products=products + receipt.products[1:])
+
+    lines = generate_receipt_text(receipt).split("\n")
+    assert lines[3] == " " * 16 + "896 610.00".rjust(16)
+
+
+@pytest.mark.parametrize(
+    "line_length", [0, RECEIPT_LINE_LENGTH_MIN - 1, RECEIPT_LINE_LENGTH_MAX + 1, 10**7]
+)
+def test_renderers_are_only_made_for_bounded_line_lengths(line_length):
+    with pytest.raises(ValueError):
+        get_receipt_renderer(line_length)
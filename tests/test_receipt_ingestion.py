@@ -0,0 +1,232 @@
+import dataclasses
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from src.core import settings
+from src.repositories.receipt_repository import ReceiptRepository
+from src.services.receipt_ingestion import receipt_ingestion_worker
+from src.services.receipt_queue import receipt_queue
+
+RECEIPT_DATA = {
+    "products": [
+        {"name": "Item 1", "price": 10.5, "quantity": 2},
+        {"name": "Item 2", "price": 5.75, "quantity": 3},
+    ],
+    "payment": {"amount": 50, "type": "cash"},
+}
+
+
+@pytest.fixture(scope="function")
+def write_behind(client, db_session, monkeypatch, tmp_path):
+    """Enable write-behind creation with a queue of its own"""
+    monkeypatch.setattr(settings, "RECEIPT_WRITE_BEHIND_ENABLED", True)
+    # The worker stores receipts in the testing database, not the configured one.
+    monkeypatch.setattr(
+        receipt_ingestion_worker,
+        "session_factory",
+        sessionmaker(bind=db_session.get_bind()),
+    )
+    default_path = receipt_queue.path
+    receipt_queue.reopen(str(tmp_path / "receipt_queue.db"))
+    yield receipt_queue
+    receipt_queue.reopen(default_path)
+
+
+def auth_headers(access_token, **headers):
+    return {"Authorization": f"Bearer {access_token}", **headers}
+
+
+def accept_receipt(client, access_token, receipt_data=RECEIPT_DATA):
+    return client.post(
+        "/api/receipts",
+        json=receipt_data,
+        headers=auth_headers(access_token, Prefer="respond-async"),
+    )
+
+
+def test_accepted_receipt_is_stored_in_background(client, access_token, write_behind):
+    response = accept_receipt(client, access_token)
+
+    assert response.status_code == 202
+    assert response.headers["Preference-Applied"] == "respond-async"
+    accepted = response.json()
+    assert accepted["id"] is None
+    assert accepted["total"] == 38.25
+    assert accepted["rest"] == 11.75
+    status_url = response.headers["Location"]
+    assert status_url.endswith(f"/api/receipts/{accepted['public_id']}/status")
+
+    status = client.get(status_url, headers=auth_headers(access_token)).json()
+    assert status["status"] == "queued"
+    listed = client.get("/api/receipts", headers=auth_headers(access_token)).json()
+    assert listed["total_count"] == 0
+
+    assert receipt_ingestion_worker.drain() == 1
+
+    status = client.get(status_url, headers=auth_headers(access_token)).json()
+    assert status["status"] == "stored"
+    receipt = client.get(
+        f"/api/receipts/{status['id']}", headers=auth_headers(access_token)
+    ).json()
+    assert receipt["public_id"] == accepted["public_id"]
+    assert receipt["total"] == 38.25
+    assert receipt["created_at"][:19] == accepted["created_at"][:19]
+    listed = client.get("/api/receipts", headers=auth_headers(access_token)).json()
+    assert listed["total_count"] == 1
+
+
+def test_accepted_receipt_replay_keeps_headers(client, access_token, write_behind):
+    headers = auth_headers(
+        access_token, Prefer="respond-async", **{"Idempotency-Key": "a1"}
+    )
+
+    first = client.post("/api/receipts", json=RECEIPT_DATA, headers=headers)
+    retry = client.post("/api/receipts", json=RECEIPT_DATA, headers=headers)
+
+    assert retry.status_code == first.status_code == 202
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.headers["Location"] == first.headers["Location"]
+    assert retry.headers["Preference-Applied"] == "respond-async"
+    assert retry.json() == first.json()
+    assert write_behind.stats()["pending"] == 1
+
+
+def test_receipts_are_created_synchronously_unless_preferred(
+    client, access_token, monkeypatch, write_behind
+):
+    response = client.post(
+        "/api/receipts", json=RECEIPT_DATA, headers=auth_headers(access_token)
+    )
+    assert response.status_code == 201
+
+    monkeypatch.setattr(settings, "RECEIPT_WRITE_BEHIND_ENABLED", False)
+    response = accept_receipt(client, access_token)
+    assert response.status_code == 201
+    assert write_behind.stats()["pending"] == 0
+
+
+def test_accepted_batch_is_stored_in_micro_batches(
+    client, access_token, monkeypatch, write_behind
+):
+    monkeypatch.setattr(receipt_ingestion_worker, "batch_size", 2)
+    batch_sizes = []
+    save_receipts = ReceiptRepository.save_receipts
+
+    def record_batch(self, receipt_entities):
+        batch_sizes.append(len(receipt_entities))
+        return save_receipts(self, receipt_entities)
+
+    monkeypatch.setattr(ReceiptRepository, "save_receipts", record_batch)
+
+    response = client.post(
+        "/api/receipts/batch",
+        json=[RECEIPT_DATA] * 5,
+        headers=auth_headers(access_token, Prefer="respond-async; wait=0"),
+    )
+
+    assert response.status_code == 202
+    public_ids = [r["public_id"] for r in response.json()["receipts"]]
+    assert len(set(public_ids)) == 5
+
+    assert receipt_ingestion_worker.drain() == 5
+    assert batch_sizes == [2, 2, 1]
+
+    listed = client.get("/api/receipts", headers=auth_headers(access_token)).json()
+    assert [r["public_id"] for r in listed["receipts"]] == public_ids
+
+
+def test_full_queue_rejects_receipts(client, access_token, monkeypatch, write_behind):
+    monkeypatch.setattr(write_behind, "max_size", 1)
+
+    assert accept_receipt(client, access_token).status_code == 202
+    response = accept_receipt(client, access_token)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert write_behind.stats()["pending"] == 1
+
+
+def test_unknown_payment_type_is_rejected_up_front(client, access_token, write_behind):
+    receipt_data = {**RECEIPT_DATA, "payment": {"amount": 50, "type": "barter"}}
+
+    response = accept_receipt(client, access_token, receipt_data)
+
+    assert response.status_code == 422
+    assert write_behind.stats()["pending"] == 0
+
+
+def test_redelivered_receipt_is_stored_once(client, access_token, write_behind):
+    accept_receipt(client, access_token)
+    (queued,) = write_behind.take(1)
+    receipt_ingestion_worker.drain()
+
+    # As if the process died after the commit, before the queue was updated.
+    write_behind.put([queued.receipt])
+    assert receipt_ingestion_worker.drain() == 0
+
+    assert write_behind.stats()["pending"] == 0
+    listed = client.get("/api/receipts", headers=auth_headers(access_token)).json()
+    assert listed["total_count"] == 1
+
+
+def test_receipt_rejected_by_database_is_marked_failed(
+    client, access_token, write_behind
+):
+    public_id = accept_receipt(client, access_token).json()["public_id"]
+    accept_receipt(client, access_token)
+    first, _ = write_behind.take(2)
+    write_behind.remove([first.seq])
+    broken_product = dataclasses.replace(first.receipt.products[0], name=None)
+    write_behind.put([dataclasses.replace(first.receipt, products=(broken_product,))])
+
+    assert receipt_ingestion_worker.drain() == 1
+
+    status = client.get(
+        f"/api/receipts/{public_id}/status", headers=auth_headers(access_token)
+    ).json()
+    assert status["status"] == "failed"
+    assert status["error"]
+    assert write_behind.stats()["failed"] == 1
+    assert write_behind.stats()["pending"] == 0
+
+
+def test_receipt_the_driver_refuses_does_not_block_the_queue(
+    client, access_token, write_behind
+):
+    public_id = accept_receipt(client, access_token).json()["public_id"]
+    (poison,) = write_behind.take(1)
+    write_behind.remove([poison.seq])
+    # Too many kopecks for a bigint, SQLite raises OverflowError on binding.
+    write_behind.put([dataclasses.replace(poison.receipt, total=10**19)])
+    accept_receipt(client, access_token)
+
+    assert receipt_ingestion_worker.drain() == 1
+
+    status = client.get(
+        f"/api/receipts/{public_id}/status", headers=auth_headers(access_token)
+    ).json()
+    assert status["status"] == "failed"
+    assert write_behind.stats()["failed"] == 1
+    assert write_behind.stats()["pending"] == 0
+    listed = client.get("/api/receipts", headers=auth_headers(access_token)).json()
+    assert listed["total_count"] == 1
+
+
+def test_receipt_status_not_found(client, access_token, write_behind):
+    response = client.get(
+        f"/api/receipts/{uuid4()}/status", headers=auth_headers(access_token)
+    )
+
+    assert response.status_code == 404
+
+
+def test_receipt_queue_stats(client, access_token, write_behind, internal_headers):
+    accept_receipt(client, access_token)
+
+    stats = client.get("/api/internal/receipts/queue", headers=internal_headers).json()
+
+    assert stats["pending"] == 1
+    assert stats["failed"] == 0
+    assert stats["oldest_pending_seconds"] >= 0
@@ -1,6 +1,37 @@
-from datetime import datetime
+import csv
+import json
+from datetime import datetime, timezone
 from uuid import uuid4
 
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from src.core.constants import (
+    RECEIPT_LINE_LENGTH_MAX,
+    RECEIPT_LINE_LENGTH_MIN,
+    RECEIPT_PRODUCT_MAX_QUANTITY,
+    PaginationMode,
+    ReceiptSortField,
+    SortDirection,
+)
+from src.core.money import MAX_AMOUNT
+from src.db.functions import truncate_period
+from src.db.models.receipt import Receipt, ReceiptDailyRollup
+from src.dependencies.receipt import get_receipt_exporter
+from src.domain.models import ReceiptFilters
+from src.main import app
+from src.repositories.idempotency_key_repository import IdempotencyKeyRepository
+from src.repositories.pagination import ReceiptCursor
+from src.repositories.receipt_repository import ReceiptRepository
+from src.repositories.receipt_rollup_repository import ReceiptRollupRepository
+from src.schemas.receipt import PaginatedReceiptResponseSchema, ReceiptResponseSchema
+from src.services.receipt_export import ReceiptExporter
+from src.services.receipt_text_cache import RenderedReceipt, RenderedReceiptCache
+
+pytestmark = pytest.mark.db_runners("sync", "async")
+
 
 def test_create_receipt(client, access_token):
     # Data for creating a receipt
@@ -111,3 +142,704 @@ def test_view_non_existent_receipt_by_public_id(client, access_token):
 
     assert response.status_code == 404
     assert response.json()["detail"] == "Receipt not found"
+
+
+def test_list_receipts_query_count_does_not_depend_on_page_size(
+    client, access_token, make_receipt, count_queries
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    make_receipt()
+    with count_queries() as single_receipt_queries:
+        client.get("/api/receipts?limit=100", headers=headers)
+
+    for _ in range(5):
+        make_receipt()
+    with count_queries() as many_receipts_queries:
+        response = client.get("/api/receipts?limit=100", headers=headers)
+
+    assert len(response.json()["receipts"]) == 6
+    assert len(many_receipts_queries) == len(single_receipt_queries)
+
+
+def test_get_receipt_by_id_runs_bounded_queries(
+    client, access_token, receipt_id, max_queries
+):
+    # One query to authenticate the user, one for the receipt with its products
+    with max_queries(2):
+        response = client.get(
+            f"/api/receipts/{receipt_id}",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+    assert response.status_code == 200
+    assert len(response.json()["products"]) == 2
+
+
+def test_view_receipt_by_public_id_runs_single_query(
+    client, receipt_public_id, max_queries
+):
+    with max_queries(1):
+        response = client.get(f"/api/receipts/{receipt_public_id}/view")
+
+    assert response.status_code == 200
+
+
+def test_list_receipts_with_cursor_pagination(client, access_token, make_receipt):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    created_ids = [make_receipt()["id"] for _ in range(5)]
+
+    seen_ids = []
+    response = client.get("/api/receipts?pagination=cursor&limit=2", headers=headers)
+    while True:
+        assert response.status_code == 200
+        response_data = response.json()
+        seen_ids.extend(r["id"] for r in response_data["receipts"])
+        if not response_data["next_cursor"]:
+            break
+        response = client.get(
+            f"/api/receipts?limit=2&cursor={response_data['next_cursor']}",
+            headers=headers,
+        )
+
+    assert seen_ids == created_ids
+
+
+def test_list_receipts_with_invalid_cursor(client, access_token):
+    response = client.get(
+        "/api/receipts?cursor=not-a-cursor",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+def test_list_receipts_without_count(client, access_token, receipt_id):
+    response = client.get(
+        "/api/receipts?count=none",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["total_count"] is None
+    assert len(response.json()["receipts"]) == 1
+
+
+def test_list_receipts_count_is_cached_until_new_receipt(
+    client, access_token, make_receipt, count_queries
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    make_receipt()
+    with count_queries() as first_page_queries:
+        response = client.get("/api/receipts?count=exact", headers=headers)
+    assert response.json()["total_count"] == 1
+
+    with count_queries() as cached_count_queries:
+        response = client.get("/api/receipts?count=exact", headers=headers)
+    assert response.json()["total_count"] == 1
+    assert len(cached_count_queries) == len(first_page_queries) - 1
+
+    make_receipt()
+    response = client.get("/api/receipts?count=estimate", headers=headers)
+    assert response.json()["total_count"] == 2
+
+
+@pytest.mark.parametrize(
+    "price, quantity, amount, status_code",
+    [
+        (MAX_AMOUNT, 1, MAX_AMOUNT, 201),
+        (MAX_AMOUNT + 0.01, 1, MAX_AMOUNT, 422),
+        (MAX_AMOUNT / 2, 3, MAX_AMOUNT, 422),
+        (0, RECEIPT_PRODUCT_MAX_QUANTITY + 1, 1, 422),
+        (1, 1, MAX_AMOUNT + 0.01, 422),
+        (1e17, 1, 1e17, 422),
+    ],
+)
+def test_create_receipt_amount_limits(
+    client, access_token, price, quantity, amount, status_code
+):
+    receipt_data = {
+        "products": [{"name": "Item 1", "price": price, "quantity": quantity}],
+        "payment": {"amount": amount, "type": "card"},
+    }
+
+    response = client.post(
+        "/api/receipts",
+        json=receipt_data,
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == status_code
+
+
+@pytest.mark.parametrize("parameter", ["minimum_total", "maximum_total"])
+def test_total_filters_are_bounded(client, access_token, parameter):
+    headers = {"Authorization": f"Bearer {access_token}"}
+
+    response = client.get(f"/api/receipts?{parameter}={MAX_AMOUNT}", headers=headers)
+    assert response.status_code == 200
+
+    response = client.get(f"/api/receipts?{parameter}=1e17", headers=headers)
+    assert response.status_code == 422
+
+
+def test_create_receipts_batch(client, access_token, count_queries):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    receipt_data = {
+        "products": [
+            {"name": "Item 1", "price": 10.5, "quantity": 2},
+            {"name": "Item 2", "price": 5.75, "quantity": 3},
+        ],
+        "payment": {"amount": 50, "type": "cash"},
+    }
+
+    with count_queries() as statements:
+        response = client.post(
+            "/api/receipts/batch", json=[receipt_data] * 20, headers=headers
+        )
+
+    assert response.status_code == 201
+    created = response.json()["receipts"]
+    assert len(created) == 20
+    assert len({r["public_id"] for r in created}) == 20
+    # Receipts, products and the daily rollup upsert
+    assert len([s for s in statements if s.startswith("INSERT")]) == 3
+    assert not any(s.startswith("SELECT") for s in statements)
+
+    receipt = client.get(f"/api/receipts/{created[-1]['id']}", headers=headers).json()
+    assert receipt["total"] == 38.25
+    assert receipt["rest"] == 11.75
+    assert len(receipt["products"]) == 2
+
+
+def test_create_receipts_batch_rejects_empty_batch(client, access_token):
+    response = client.post(
+        "/api/receipts/batch",
+        json=[],
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == 422
+
+
+def test_create_receipt_runs_minimum_statements(client, access_token, count_queries):
+    receipt_data = {
+        "products": [
+            {"name": "Item 1", "price": 10.5, "quantity": 2},
+            {"name": "Item 2", "price": 5.75, "quantity": 3},
+        ],
+        "payment": {"amount": 50, "type": "cash"},
+    }
+
+    with count_queries() as statements:
+        response = client.post(
+            "/api/receipts",
+            json=receipt_data,
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+
+    assert response.status_code == 201
+    assert response.json()["created_at"]
+    assert len(response.json()["products"]) == 2
+    # INSERT receipt RETURNING server values, INSERT all products, upsert the
+    # daily rollup, nothing else
+    assert len(statements) == 3
+
+
+def test_view_receipt_is_cached_and_supports_etag(
+    client, receipt_public_id, count_queries
+):
+    url = f"/api/receipts/{receipt_public_id}/view?line_length=40"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert "immutable" in response.headers["Cache-Control"]
+    etag = response.headers["ETag"]
+
+    with count_queries() as statements:
+        cached_response = client.get(url)
+        not_modified_response = client.get(url, headers={"If-None-Match": etag})
+
+    assert not statements
+    assert cached_response.text == response.text
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.headers["ETag"] == etag
+    assert not not_modified_response.content
+
+
+@pytest.mark.parametrize(
+    "line_length", [-1, 0, RECEIPT_LINE_LENGTH_MIN - 1, RECEIPT_LINE_LENGTH_MAX + 1]
+)
+def test_receipt_line_length_is_bounded(
+    client, access_token, receipt_public_id, line_length
+):
+    response = client.get(
+        f"/api/receipts/{receipt_public_id}/view?line_length={line_length}"
+    )
+    assert response.status_code == 422
+
+    response = client.get(
+        f"/api/receipts/export?format=text&line_length={line_length}",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 422
+
+
+def test_rendered_receipt_cache_respects_memory_bound():
+    cache = RenderedReceiptCache(max_entries=100, max_bytes=100)
+    first_id, second_id = uuid4(), uuid4()
+    cache.set(first_id, 32, RenderedReceipt.from_text("a" * 60))
+    cache.set(second_id, 32, RenderedReceipt.from_text("b" * 60))
+
+    assert cache.get(first_id, 32) is None
+    assert cache.get(second_id, 32).text == "b" * 60
+    assert cache.size_bytes == 60
+
+
+def test_export_receipts_as_ndjson(client, access_token, make_receipt):
+    created_ids = [make_receipt()["id"] for _ in range(3)]
+
+    response = client.get(
+        "/api/receipts/export?format=ndjson",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [receipt["id"] for receipt in exported] == created_ids
+    assert all(len(receipt["products"]) == 2 for receipt in exported)
+
+
+def test_export_receipts_as_csv(client, access_token, make_receipt):
+    make_receipt()
+    make_receipt()
+
+    response = client.get(
+        "/api/receipts/export?format=csv",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == 200
+    assert 'filename="receipts.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert len(rows) == 4  # one row per product
+    assert {row["product_name"] for row in rows} == {"Item 1", "Item 2"}
+
+
+def test_export_receipt_without_products_as_csv(client, access_token):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    created = client.post(
+        "/api/receipts",
+        json={"products": [], "payment": {"amount": 50, "type": "cash"}},
+        headers=headers,
+    )
+    assert created.status_code == 201
+
+    response = client.get("/api/receipts/export?format=csv", headers=headers)
+
+    (row,) = csv.DictReader(response.text.splitlines())
+    assert row["receipt_id"] == str(created.json()["id"])
+    assert row["receipt_total"] == "0.0"
+    assert row["product_name"] == row["price"] == row["quantity"] == ""
+
+
+def test_export_receipts_as_text_in_batches(
+    client, access_token, make_receipt, db_session
+):
+    for _ in range(5):
+        make_receipt()
+    app.dependency_overrides[get_receipt_exporter] = lambda: ReceiptExporter(
+        sessionmaker(bind=db_session.get_bind()), batch_size=2
+    )
+    try:
+        response = client.get(
+            "/api/receipts/export?format=text&minimum_total=30",
+            headers={"Authorization": f"Bearer {access_token}"},
+        )
+    finally:
+        del app.dependency_overrides[get_receipt_exporter]
+
+    assert response.status_code == 200
+    assert response.text.count("Дякуємо за покупку!") == 5
+
+
+def test_list_receipts_payload_matches_created_receipt(
+    client, access_token, make_receipt
+):
+    created = make_receipt()
+
+    response = client.get(
+        "/api/receipts", headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["receipts"] == [created]
+
+
+def test_receipt_responses_match_response_models(client, access_token, make_receipt):
+    created = make_receipt()
+    headers = {"Authorization": f"Bearer {access_token}"}
+    fetched = client.get(f"/api/receipts/{created['id']}", headers=headers).json()
+    page = client.get("/api/receipts", headers=headers).json()
+
+    # Routes return pre-serialized payloads, the models are no longer enforced.
+    ReceiptResponseSchema.model_validate(created)
+    ReceiptResponseSchema.model_validate(fetched)
+    PaginatedReceiptResponseSchema.model_validate(page)
+    assert fetched["payment"] == {"type": "cash", "amount": 50.0}
+
+
+def test_receipt_stats_grouped_by_day_and_payment_type(
+    client, access_token, make_receipt, max_queries
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    make_receipt()
+    make_receipt()
+    card_receipt = {
+        "products": [{"name": "Item 3", "price": 20, "quantity": 1}],
+        "payment": {"amount": 20, "type": "card"},
+    }
+    client.post("/api/receipts", json=card_receipt, headers=headers)
+
+    with max_queries(1):
+        response = client.get(
+            "/api/receipts/stats?period=day&by_payment_type=true", headers=headers
+        )
+
+    assert response.status_code == 200
+    # SQLite stamps receipts with the UTC date.
+    today = datetime.now(timezone.utc).date().isoformat()
+    assert response.json()["groups"] == [
+        {
+            "period": today,
+            "payment_type": "card",
+            "receipts_count": 1,
+            "revenue": 20.0,
+            "average_ticket": 20.0,
+        },
+        {
+            "period": today,
+            "payment_type": "cash",
+            "receipts_count": 2,
+            "revenue": 76.5,
+            "average_ticket": 38.25,
+        },
+    ]
+
+
+def test_amounts_are_exact_in_minor_units(client, access_token):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    receipt_data = {
+        "products": [
+            {"name": "Item 1", "price": 0.1, "quantity": 1},
+            {"name": "Item 2", "price": 0.2, "quantity": 1},
+        ],
+        "payment": {"amount": 1, "type": "cash"},
+    }
+    for _ in range(3):
+        response = client.post("/api/receipts", json=receipt_data, headers=headers)
+        assert response.status_code == 201
+        assert response.json()["total"] == 0.3
+        assert response.json()["rest"] == 0.7
+
+    response = client.get("/api/receipts/stats", headers=headers)
+    assert response.json()["groups"][0]["revenue"] == 0.9
+
+    response = client.get("/api/receipts?minimum_total=0.3", headers=headers)
+    assert len(response.json()["receipts"]) == 3
+
+
+def test_receipt_stats_without_grouping(client, access_token):
+    response = client.get(
+        "/api/receipts/stats", headers={"Authorization": f"Bearer {access_token}"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["groups"] == [
+        {
+            "period": None,
+            "payment_type": None,
+            "receipts_count": 0,
+            "revenue": 0.0,
+            "average_ticket": None,
+        }
+    ]
+
+
+def test_truncate_period_compiles_to_date_trunc_on_postgresql():
+    expression = truncate_period("week", Receipt.created_at)
+
+    assert str(expression.compile(dialect=postgresql.dialect())) == (
+        "CAST(date_trunc('week', receipt.created_at AT TIME ZONE 'UTC') AS DATE)"
+    )
+    # Rollup days are UTC days already.
+    expression = truncate_period("month", ReceiptDailyRollup.day)
+    assert str(expression.compile(dialect=postgresql.dialect())) == (
+        "CAST(date_trunc('month', receipt_daily_rollup.day) AS DATE)"
+    )
+
+
+def test_receipt_stats_read_from_daily_rollups(
+    client, access_token, make_receipt, count_queries, db_session
+):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    make_receipt()
+    make_receipt()
+
+    with count_queries() as statements:
+        response = client.get("/api/receipts/stats?period=month", headers=headers)
+    assert "receipt_daily_rollup" in statements[-1]
+    from_rollups = response.json()["groups"]
+    assert from_rollups[0]["receipts_count"] == 2
+    assert from_rollups[0]["revenue"] == 76.5
+
+    # A minimum total cannot be answered from rollups, receipts are scanned.
+    response = client.get("/api/receipts/stats?minimum_total=0", headers=headers)
+    assert response.json()["groups"][0]["receipts_count"] == 2
+
+    # Rebuilding from the receipt table gives the same rollups.
+    assert ReceiptRollupRepository(db_session).rebuild() == 1
+    response = client.get("/api/receipts/stats?period=month", headers=headers)
+    assert response.json()["groups"] == from_rollups
+
+
+def test_list_receipts_containing_product(client, access_token, make_receipt):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    make_receipt()
+    other_receipt = {
+        "products": [{"name": "Mavic 3T 100%", "price": 20, "quantity": 1}],
+        "payment": {"amount": 20, "type": "card"},
+    }
+    other_id = client.post("/api/receipts", json=other_receipt, headers=headers).json()[
+        "id"
+    ]
+
+    response = client.get("/api/receipts?product=mavic", headers=headers)
+    assert [r["id"] for r in response.json()["receipts"]] == [other_id]
+    assert response.json()["total_count"] == 1
+
+    # LIKE wildcards in the search term match literally.
+    response = client.get("/api/receipts?product=3T 100%25", headers=headers)
+    assert [r["id"] for r in response.json()["receipts"]] == [other_id]
+    response = client.get("/api/receipts?product=Item_", headers=headers)
+    assert response.json()["receipts"] == []
+
+
+def test_top_products_by_revenue(client, access_token, make_receipt):
+    make_receipt()
+    make_receipt()
+
+    response = client.get(
+        "/api/products/top?limit=1",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["products"] == [
+        {"name": "Item 1", "quantity": 4.0, "revenue": 42.0, "receipts_count": 2}
+    ]
+
+
+def test_product_search_uses_receipt_id_index(client, db_session):
+    query = ReceiptRepository(db_session)._filtered_query(
+        1, ReceiptFilters(product_name="Item")
+    )
+    statement = query.statement.compile(
+        dialect=db_session.get_bind().dialect, compile_kwargs={"literal_binds": True}
+    )
+    plan = db_session.execute(text(f"EXPLAIN QUERY PLAN {statement}")).all()
+
+    assert any("ix_receipt_product_receipt_id" in row[-1] for row in plan)
+
+
+def create_receipt_with_total(client, access_token, total):
+    response = client.post(
+        "/api/receipts",
+        json={
+            "products": [{"name": "Item", "price": total, "quantity": 1}],
+            "payment": {"amount": total, "type": "card"},
+        },
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    return response.json()["id"]
+
+
+def test_list_receipts_with_range_filters(client, access_token):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    ids = {
+        total: create_receipt_with_total(client, access_token, total)
+        for total in (5, 10, 20)
+    }
+
+    response = client.get(
+        "/api/receipts?minimum_total=10&maximum_total=10", headers=headers
+    )
+    assert [r["id"] for r in response.json()["receipts"]] == [ids[10]]
+
+    response = client.get(
+        "/api/receipts?created_before=2000-01-01T00:00:00", headers=headers
+    )
+    assert response.json()["receipts"] == []
+
+
+def test_zero_minimum_total_is_applied(client, db_session):
+    query = ReceiptRepository(db_session)._filtered_query(
+        1, ReceiptFilters(minimum_total=0, maximum_total=0)
+    )
+
+    statement = str(query.statement)
+    assert "receipt.total >=" in statement
+    assert "receipt.total <=" in statement
+
+
+def test_list_receipts_ordered_by_total_with_cursor(client, access_token):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    totals = [15, 5, 25, 5, 10]
+    ids = [create_receipt_with_total(client, access_token, t) for t in totals]
+    expected = [i for _, i in sorted(zip(totals, ids), key=lambda p: (-p[0], -p[1]))]
+
+    response = client.get(
+        "/api/receipts?order_by=total&order=desc&limit=2&pagination=cursor",
+        headers=headers,
+    )
+    seen_ids = []
+    while True:
+        response_data = response.json()
+        seen_ids.extend(r["id"] for r in response_data["receipts"])
+        if not response_data["next_cursor"]:
+            break
+        # The cursor keeps the order it was issued for.
+        response = client.get(
+            f"/api/receipts?limit=2&cursor={response_data['next_cursor']}",
+            headers=headers,
+        )
+
+    assert seen_ids == expected
+
+
+@pytest.mark.parametrize(
+    "sort_field, direction, index",
+    [
+        ("created_at", "asc", "ix_receipt_user_id_created_at_id"),
+        ("created_at", "desc", "ix_receipt_user_id_created_at_id"),
+        ("total", "asc", "ix_receipt_user_id_total_id"),
+        ("total", "desc", "ix_receipt_user_id_total_id"),
+    ],
+)
+def test_sorted_receipt_pages_are_read_from_index(
+    client, db_session, sort_field, direction, index
+):
+    sort_field, direction = ReceiptSortField(sort_field), SortDirection(direction)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        ReceiptRepository(db_session).list_receipts(
+            1,
+            ReceiptFilters(),
+            limit=10,
+            offset=0,
+            pagination=PaginationMode.CURSOR,
+            after=ReceiptCursor(
+                value=datetime(2024, 1, 1) if sort_field == "created_at" else 10.0,
+                id=1,
+                sort_field=sort_field,
+                direction=direction,
+            ),
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    page_statement, parameters = statements[0]
+    plan = db_session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {page_statement}", parameters
+    )
+    details = [row[-1] for row in plan]
+    assert any(index in detail for detail in details), details
+    # Rows come back in index order, no separate sort step.
+    assert not any("TEMP B-TREE" in detail for detail in details), details
+
+
+def test_idempotency_key_replays_created_receipt(client, access_token, count_queries):
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Idempotency-Key": "terminal-7-sale-42",
+    }
+    receipt_data = {
+        "products": [{"name": "Item 1", "price": 10.5, "quantity": 2}],
+        "payment": {"amount": 50, "type": "cash"},
+    }
+
+    first = client.post("/api/receipts", json=receipt_data, headers=headers)
+    with count_queries() as statements:
+        retry = client.post("/api/receipts", json=receipt_data, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.headers["content-type"] == first.headers["content-type"]
+    # The replay only reads the stored response.
+    assert all("idempotency_key" in statement for statement in statements)
+
+    response = client.get(
+        "/api/receipts", headers={"Authorization": f"Bearer {access_token}"}
+    )
+    assert len(response.json()["receipts"]) == 1
+
+
+def test_receipt_is_not_stored_without_its_idempotent_response(
+    client, access_token, monkeypatch
+):
+    headers = {"Authorization": f"Bearer {access_token}", "Idempotency-Key": "k1"}
+    receipt_data = {
+        "products": [{"name": "Item 1", "price": 10.5, "quantity": 2}],
+        "payment": {"amount": 50, "type": "cash"},
+    }
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("Process died before the response was stored")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(IdempotencyKeyRepository, "complete", crash)
+        with pytest.raises(RuntimeError):
+            client.post("/api/receipts", json=receipt_data, headers=headers)
+
+    # The key is held until its lock expires, and no receipt was stored for it.
+    response = client.post("/api/receipts", json=receipt_data, headers=headers)
+    assert response.status_code == 409
+    response = client.get(
+        "/api/receipts", headers={"Authorization": f"Bearer {access_token}"}
+    )
+    assert response.json()["total_count"] == 0
+
+
+def test_idempotency_key_reused_for_different_request(client, access_token):
+    headers = {"Authorization": f"Bearer {access_token}", "Idempotency-Key": "k1"}
+    receipt_data = {
+        "products": [{"name": "Item 1", "price": 10.5, "quantity": 2}],
+        "payment": {"amount": 50, "type": "cash"},
+    }
+    client.post("/api/receipts", json=receipt_data, headers=headers)
+
+    receipt_data["payment"]["amount"] = 60
+    response = client.post("/api/receipts", json=receipt_data, headers=headers)
+
+    assert response.status_code == 422
+
+
+def test_idempotency_key_on_batch_create(client, access_token):
+    headers = {"Authorization": f"Bearer {access_token}", "Idempotency-Key": "b1"}
+    receipt_data = {
+        "products": [{"name": "Item 1", "price": 10.5, "quantity": 2}],
+        "payment": {"amount": 50, "type": "cash"},
+    }
+
+    first = client.post("/api/receipts/batch", json=[receipt_data] * 2, headers=headers)
+    retry = client.post("/api/receipts/batch", json=[receipt_data] * 2, headers=headers)
+
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
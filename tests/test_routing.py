@@ -0,0 +1,98 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.core.constants import PaymentType
+from src.db.routing import RecentWrites, RoutingSession, use_primary
+from src.db.session import Base
+from src.domain.models import (
+    PaymentEntity,
+    ProductEntity,
+    ReceiptEntity,
+    ReceiptFilters,
+)
+from src.repositories.receipt_repository import ReceiptRepository
+from src.repositories.user_repository import UserRepository
+
+
+@pytest.fixture
+def routing_session(tmp_path):
+    """Session over a primary and a replica that never receives the writes"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(primary)
+    Base.metadata.create_all(replica)
+
+    session_factory = sessionmaker(
+        class_=RoutingSession,
+        primary_bind=primary,
+        replica_bind=replica,
+        expire_on_commit=False,
+    )
+    with session_factory() as session:
+        yield session
+
+
+def save_receipt(session, user_id):
+    receipt = ReceiptEntity(
+        user_id=user_id,
+        products=(ProductEntity(name="Item", price=1000, quantity=1),),
+        payment=PaymentEntity(amount=1000, type=PaymentType.CARD),
+    ).with_totals()
+    return ReceiptRepository(session).save_receipt(receipt)
+
+
+def test_writes_go_to_primary_and_reads_to_replica(routing_session):
+    users = UserRepository(routing_session)
+    user = users.create_user(name="John", username="john", password_hash="-")
+    save_receipt(routing_session, user.id)
+    receipts = ReceiptRepository(routing_session)
+
+    # Lists read the lagging replica...
+    page = receipts.list_receipts(user.id, ReceiptFilters(), limit=10, offset=0)
+    assert page.receipts == []
+
+    # ...until the session is pinned to the primary.
+    use_primary(routing_session)
+    page = receipts.list_receipts(user.id, ReceiptFilters(), limit=10, offset=0)
+    assert len(page.receipts) == 1
+
+
+def test_point_lookups_fall_back_to_primary(routing_session):
+    user = UserRepository(routing_session).create_user(
+        name="John", username="john", password_hash="-"
+    )
+    receipt = save_receipt(routing_session, user.id)
+    receipts = ReceiptRepository(routing_session)
+
+    assert UserRepository(routing_session).get_user_by_username("john").id == user.id
+    assert receipts.get_receipt_by_id(receipt.id, user.id)["id"] == receipt.id
+    assert receipts.get_receipt_by_public_id(receipt.public_id).id == receipt.id
+    assert receipts.get_receipt_by_id(receipt.id + 1, user.id) is None
+
+
+def test_recent_writes_expire_after_window():
+    writes = RecentWrites(maxsize=10, window=60)
+    writes.mark(1)
+    assert 1 in writes
+    assert 2 not in writes
+
+    expired = RecentWrites(maxsize=10, window=0)
+    expired.mark(1)
+    assert 1 not in expired
+
+
+def test_creating_receipt_marks_user_as_recent_writer(client, access_token):
+    from src.db.routing import recent_writes
+
+    user_id = client.post(
+        "/api/receipts",
+        json={
+            "products": [{"name": "Item", "price": 10, "quantity": 1}],
+            "payment": {"amount": 10, "type": "card"},
+        },
+        headers={"Authorization": f"Bearer {access_token}"},
+    ).json()["id"]
+
+    assert user_id
+    assert len(recent_writes._keys) == 1